@@ -0,0 +1,89 @@
+# Play the primes game
+# This module accumulates where players land, move and get set back, over any number of games
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import numpy as np
+
+
+class AnalyticsCollector:
+    """
+    Counts in preallocated NumPy arrays, indexed by square:
+    `visits[s]`: a player ended a turn on s or was set back to s
+    `transitions[a, b]`: a player started a turn on a and ended it on b (passes are a == b)
+    `setbacks[s]`: a player was set back from s
+    `setback_transitions[a, b]`: a player was set back from a to b
+    Attach a collector to a Game or Tournament with `analytics=collector`. Collectors from several processes
+    can be combined with `merge()`.
+    """
+    def __init__(self, board_size=100):
+        self.board_size = board_size
+        squares = board_size + 1
+        self.visits = np.zeros(squares, dtype=np.int64)
+        self.transitions = np.zeros((squares, squares), dtype=np.int64)
+        self.setbacks = np.zeros(squares, dtype=np.int64)
+        self.setback_transitions = np.zeros((squares, squares), dtype=np.int64)
+        self.games = 0
+
+    def record_turn(self, start, end):
+        self.transitions[start, end] += 1
+        self.visits[end] += 1
+
+    def record_setback(self, start, end):
+        self.setback_transitions[start, end] += 1
+        self.setbacks[start] += 1
+        self.visits[end] += 1
+
+    def record_game(self):
+        self.games += 1
+
+    def merge(self, other):
+        """
+        Add the counts of another collector, e.g. one returned from a worker process.
+        :param other: an AnalyticsCollector for the same board size
+        :return: self
+        """
+        assert other.board_size == self.board_size, "Can't merge analytics of different board sizes."
+        self.visits += other.visits
+        self.transitions += other.transitions
+        self.setbacks += other.setbacks
+        self.setback_transitions += other.setback_transitions
+        self.games += other.games
+        return self
+
+    def transition_probabilities(self):
+        """
+        :return: the per-turn transition matrix, each row normalised to sum to 1 (rows never visited are 0)
+        """
+        row_sums = self.transitions.sum(axis=1, keepdims=True)
+        return np.divide(self.transitions, row_sums, out=np.zeros(self.transitions.shape), where=row_sums > 0)
+
+    def setback_rates(self):
+        """
+        :return: for each square, setbacks from it per visit
+        """
+        return np.divide(self.setbacks, self.visits, out=np.zeros(self.setbacks.shape), where=self.visits > 0)
+
+    def save(self, path):
+        """
+        Save the counts as a compressed .npz file. The matrices are mostly zeros, so they compress well.
+        """
+        np.savez_compressed(path, board_size=self.board_size, games=self.games, visits=self.visits,
+                            transitions=self.transitions, setbacks=self.setbacks,
+                            setback_transitions=self.setback_transitions)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            collector = cls(int(data["board_size"]))
+            collector.games = int(data["games"])
+            for name in ("visits", "transitions", "setbacks", "setback_transitions"):
+                getattr(collector, name)[...] = data[name]
+        return collector
+
+    def print_summary(self, top=10):
+        print(f"Analytics of {self.games} games:")
+        print("Most visited squares: " + ", ".join(
+            f"{square} ({self.visits[square]})" for square in np.argsort(self.visits)[::-1][:top]))
+        print("Most setbacks from: " + ", ".join(
+            f"{square} ({self.setbacks[square]})" for square in np.argsort(self.setbacks)[::-1][:top]))
@@ -0,0 +1,288 @@
+# Play the primes game
+# This module tracks what a player can infer about the cards it can't see
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+from collections import Counter
+
+import numpy as np
+
+from players import *
+
+
+class BeliefTracker:
+    """
+    Belief state over the symbols of all cards a player hasn't seen.
+
+    The backs of the cards show their numbers, so the only hidden information is the symbol of each unseen card.
+    Cards of the same number are exchangeable, so every unseen card with number n has the same distribution
+    over symbols: the symbols of number n cards that haven't been seen yet. This includes cards in the opponents'
+    hands, cards in the deck and cards that were played face down.
+
+    `unseen[n, s]` counts the unseen cards with number n and symbol `symbols[s]`, and `probabilities[n, s]`
+    is the probability that an unseen card with number n carries that symbol. Each observed card changes
+    one row of each table.
+    """
+    def __init__(self, card_dict=None, board_size=100):
+        """
+        :param card_dict: the card catalogue, default is `carddict.cardDict`
+        :param board_size: the number of the last square
+        """
+        card_dict = cardDict if card_dict is None else card_dict
+        self.card_dict = {number: tuple(symbols) for number, symbols in card_dict.items()}
+        self.board_size = board_size
+        self.numbers = sorted(card_dict)
+        self.symbols = sorted({symbol for symbols in card_dict.values() for symbol in symbols})
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.total = np.zeros((max(self.numbers) + 1, len(self.symbols)), dtype=np.int32)
+        for number, symbols in card_dict.items():
+            for symbol in symbols:
+                self.total[number, self.symbol_index[symbol]] += 1
+        self.number_of_cards = int(self.total.sum())
+        self.reset()
+
+    @classmethod
+    def for_rules(cls, rules, belief=None):
+        """
+        Get a belief tracker for a new game.
+        :param rules: the Rules of the game
+        :param belief: the tracker used so far, if any
+        :return: `belief`, reset, if it was made for the same deck and board, otherwise a new BeliefTracker
+        """
+        if belief is not None and belief.card_dict == rules.card_dict and belief.board_size == rules.board_size:
+            belief.reset()
+            return belief
+        return cls(rules.card_dict, rules.board_size)
+
+    def reset(self):
+        """
+        Forget everything for a new game.
+        :return: None
+        """
+        self.unseen = self.total.copy()
+        row_sums = self.unseen.sum(axis=1, keepdims=True)
+        self.probabilities = np.divide(self.unseen, row_sums, out=np.zeros(self.unseen.shape), where=row_sums > 0)
+        self.cards_in_deck = self.number_of_cards
+        self.top_of_deck = None
+        self.face_down = Counter()
+        self.setback_cache = {}
+
+    def _update_row(self, number):
+        self.setback_cache.clear()
+        row = self.unseen[number]
+        total = row.sum()
+        if total:
+            np.divide(row, total, out=self.probabilities[number])
+        else:
+            self.probabilities[number] = 0.0
+
+    def observe_card(self, card):
+        """
+        We have seen the symbol of a card, because it's in our hand or because it was played revealed.
+        :param card: a Card object
+        :return: None
+        """
+        column = self.symbol_index[card.symbol]
+        assert self.unseen[card.number, column] > 0, f"Seen more {card} cards than there are."
+        self.unseen[card.number, column] -= 1
+        self._update_row(card.number)
+
+    def observe_draw(self, card=None):
+        """
+        A card has been drawn from the deck.
+        :param card: the Card object if we drew it ourselves, None if an opponent drew it
+        :return: None
+        """
+        self.cards_in_deck -= 1
+        if card is not None:
+            self.observe_card(card)
+
+    def observe(self, info: Information):
+        """
+        Update the belief state from an Information object.
+        :param info: an Information object
+        :return: None
+        """
+        if isinstance(info, CardsPlayedInfo):
+            for card in info.cards_played:
+                if isinstance(card, Card):
+                    self.observe_card(card)
+                else:
+                    self.face_down[card] += 1
+        elif isinstance(info, CardDrawInfo):
+            self.observe_draw()
+        elif isinstance(info, TopOfDeckInfo):
+            self.top_of_deck = info.number
+
+    def symbol_probabilities(self, number):
+        """
+        :param number: the number on the back of an unseen card
+        :return: dict mapping each possible symbol to its probability
+        """
+        return {symbol: p for symbol, p in zip(self.symbols, self.probabilities[number]) if p > 0}
+
+    def top_of_deck_probabilities(self):
+        """
+        :return: dict mapping each symbol to the probability that the top card of the deck carries it,
+            empty if the deck is empty
+        """
+        if self.top_of_deck is None:
+            return {}
+        return self.symbol_probabilities(self.top_of_deck)
+
+    def sample_hidden(self, opponent_numbers, rng=random):
+        """
+        Sample the symbols of all unseen cards, consistent with everything observed.
+        :param opponent_numbers: for each opponent, the numbers on the backs of their cards. None stands for a card
+            whose number we don't know yet, e.g. one the opponent is going to draw; it is dealt from the deck.
+        :param rng: a random.Random object
+        :return: tuple (list of the opponents' hands, deck), where hands and deck are lists of (number, symbol)
+            tuples and the top of the deck is the end of the list
+        """
+        unseen = {number: [self.symbols[column] for column in range(len(self.symbols))
+                           for _ in range(self.unseen[number, column])] for number in self.numbers}
+        for cards in unseen.values():
+            rng.shuffle(cards)
+        hands = [[(number, unseen[number].pop()) for number in numbers if number is not None]
+                 for numbers in opponent_numbers]
+        for number, count in self.face_down.items():
+            del unseen[number][-count:]
+        deck = [(number, symbol) for number, symbols in unseen.items() for symbol in symbols]
+        rng.shuffle(deck)
+        for hand, numbers in zip(hands, opponent_numbers):
+            hand += [deck.pop() for number in numbers if number is None]
+        if self.top_of_deck is not None:
+            top = next(i for i, card in enumerate(deck) if card[0] == self.top_of_deck)
+            deck[top], deck[-1] = deck[-1], deck[top]
+        return hands, deck
+
+    def setback_probability(self, opponent_numbers, square, opponent_position=0):
+        """
+        Probability that an opponent holding cards with `opponent_numbers` can set back a player on `square`.
+        The symbols of the opponent's cards are treated as independent draws from the unseen cards.
+        For every needed prime the cheapest cards carrying it are used, so processing the cards in ascending
+        order of their numbers and using each card as soon as its symbol is still needed finds the cheapest
+        setback. We track the distribution of (needed primes covered, cost so far) in one NumPy array.
+        A setback that costs 0 doesn't move anyone, so it doesn't count. If 0 cards cover all needed primes,
+        the cheapest real setback swaps one of them for the next card with a needed prime; as the cards come
+        in ascending order, that's the first such card with a positive number.
+        Results are cached until the next observed card changes the probabilities.
+        :param opponent_numbers: the numbers on the backs of the opponent's cards
+        :param square: the square the player would be on
+        :param opponent_position: the opponent's position, because the opponent can't move past the last square
+        :return: the probability
+        """
+        max_cost = min(square, self.board_size - opponent_position)
+        key = (tuple(sorted(opponent_numbers)), square, max_cost)
+        if key not in self.setback_cache:
+            self.setback_cache[key] = self._setback_probability(key[0], square, max_cost)
+        return self.setback_cache[key]
+
+    def _setback_probability(self, opponent_numbers, square, max_cost):
+        needed = Counter(prime_factors(square))
+        if not needed or max_cost <= 0 or any(prime not in self.symbol_index for prime in needed):
+            return 0.0
+        primes = sorted(needed)
+        columns = [self.symbol_index[prime] for prime in primes]
+        # state[c_1, ..., c_k, cost]: probability that c_i cards with prime i are used and they cost `cost`
+        state = np.zeros(tuple(needed[prime] + 1 for prime in primes) + (max_cost + 1,))
+        state[(0,) * (len(primes) + 1)] = 1.0
+        covered = tuple(needed[prime] for prime in primes)
+        for number in opponent_numbers:
+            p_needed = self.probabilities[number, columns]
+            if not p_needed.any():
+                continue
+            new_state = state * (1.0 - p_needed.sum())
+            for axis, prime in enumerate(primes):
+                count = needed[prime]
+                full = [slice(None)] * state.ndim
+                full[axis] = count
+                # we have enough of this prime already, so the card isn't used
+                new_state[tuple(full)] += state[tuple(full)] * p_needed[axis]
+                if number <= max_cost:
+                    source = [slice(None)] * state.ndim
+                    source[axis] = slice(0, count)
+                    source[-1] = slice(0, max_cost + 1 - number)
+                    target = [slice(None)] * state.ndim
+                    target[axis] = slice(1, count + 1)
+                    target[-1] = slice(number, max_cost + 1)
+                    new_state[tuple(target)] += state[tuple(source)] * p_needed[axis]
+            if 0 < number <= max_cost:
+                # swap a 0 card for this one
+                swapped = state[covered + (0,)] * p_needed.sum()
+                new_state[covered + (0,)] -= swapped
+                new_state[covered + (number,)] += swapped
+            state = new_state
+        return float(state[covered][1:].sum())
+
+    def sampled_setback_probability(self, opponent_numbers, square, opponent_position=0, samples=10000, rng=random):
+        """
+        Estimate `setback_probability()` from the opponent's legal moves in hands drawn with `sample_hidden()`.
+        Unlike `setback_probability()` this accounts for the dependence between the symbols of cards with the
+        same number, so the two differ slightly when the opponent holds several cards with the same number.
+        :param samples: number of sampled hands
+        :param rng: a random.Random object
+        :return: the estimated probability
+        """
+        rules = Rules(self.board_size, self.card_dict)
+        setbacks = 0
+        for _ in range(samples):
+            hand = tuple(sorted(self.sample_hidden([opponent_numbers], rng)[0][0]))
+            setbacks += any(revealed and delta > 0 for _, revealed, delta, _
+                            in compute_grouped_moves(hand, opponent_position, ((square, 1),), rules))
+        return setbacks / samples
+
+
+class Wary(Player):
+    """
+    Like Forrest, but weighs each unrevealed move by the chance that an opponent can set us back from the square
+    we'd land on, using a BeliefTracker.
+    """
+    def __init__(self, base_name=None):
+        self.belief = None  # made for the rules of the game in reset()
+        super().__init__(base_name)
+
+    def _default_name(self) -> str:
+        return "Wary"
+
+    def reset(self):
+        super().reset()
+        self.belief = BeliefTracker.for_rules(self.rules, self.belief)
+
+    def receive_card(self, card):
+        super().receive_card(card)
+        self.belief.observe_draw(card)
+
+    def risk(self, square, opponents):
+        """
+        :return: the probability that at least one of the opponents can set us back from `square`
+        """
+        safe = 1.0
+        for opponent in opponents:
+            safe *= 1.0 - self.belief.setback_probability(opponent.reveal_card_numbers(), square, opponent.position)
+        return 1.0 - safe
+
+    async def _choose_cards_to_play(self, opponents):
+        l = self.legal_moves(opponents)
+
+        def value(move):
+            if move.revealed:
+                return 1, move.delta
+            return 0, move.position * (1.0 - self.risk(move.position, opponents))
+
+        return max(l, key=value)
+
+    def receive_information(self, info: Information):
+        self.belief.observe(info)
+
+
+if __name__ == '__main__':
+    # compare the exact probabilities with sampled hands, including hands with 0 cards
+    belief = BeliefTracker()
+    rng = random.Random(1)
+    print("numbers           square  opponent   exact  sampled")
+    for numbers, square, opponent_position in (([0, 0, 1, 2], 6, 0), ([0, 0, 1], 4, 0), ([0, 0, 0, 1, 2], 8, 0),
+                                               ([0, 1, 2, 3], 6, 97), ([3, 5, 7], 30, 0), ([0, 4, 6, 8], 12, 0)):
+        print(f"""{str(numbers):17} {square:6} {opponent_position:9} {
+            belief.setback_probability(numbers, square, opponent_position):7.4f} {
+            belief.sampled_setback_probability(numbers, square, opponent_position, 20000, rng):8.4f}""")
@@ -0,0 +1,93 @@
+# Play the primes game
+# This module measures how the cost of a turn grows with the number of players
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import sys
+import time
+
+from main import *
+
+
+class Recorder(Forrest):
+    """
+    Forrest, remembering every situation it had to decide in.
+    """
+    situations = []
+
+    async def _choose_cards_to_play(self, opponents):
+        Recorder.situations.append((tuple((card.number, card.symbol) for card in self.hand), self.position,
+                                    tuple(opponent.position for opponent in opponents), self.rules))
+        return await super()._choose_cards_to_play(opponents)
+
+
+def time_games(players, games, cache_size=DEFAULT_LEGAL_MOVE_CACHE_SIZE, seed=1):
+    """
+    :param players: number of players, all of them Forrest
+    :param games: number of games
+    :param cache_size: size of the legal move cache, 0 to switch it off
+    :param seed: random seed
+    :return: seconds per turn
+    """
+    random.seed(seed)
+    set_legal_move_cache_size(cache_size)
+    t = Tournament(*(Forrest() for _ in range(players)))
+    start = time.perf_counter()
+    t.run(games)
+    return (time.perf_counter() - start) / t.number_of_turns
+
+
+def time_move_generation(situations):
+    """
+    Generate the legal moves for all situations without any caching.
+    :param situations: list of argument tuples for `compute_legal_moves()`
+    :return: tuple (seconds per situation, seconds per legal move)
+    """
+    set_legal_move_cache_size(0)
+    start = time.perf_counter()
+    moves = sum(len(compute_legal_moves(*situation)) for situation in situations)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(situations), elapsed / moves
+
+
+def game_situations(players, games, seed=1):
+    """
+    :return: the situations Forrest had to decide in during `games` games
+    """
+    random.seed(seed)
+    Recorder.situations = []
+    Tournament(*(Recorder() for _ in range(players))).run(games)
+    return Recorder.situations
+
+
+def random_situations(players, situations, hand_size=8, rules=DEFAULT_RULES, seed=1):
+    """
+    :return: situations with random hands of `hand_size` cards and everyone on random squares. Unlike in real
+        games, the hands don't get smaller with more players.
+    """
+    rng = random.Random(seed)
+    return [(tuple(sorted(rng.sample(rules.deck, hand_size))), rng.randrange(rules.board_size),
+             tuple(rng.randrange(rules.board_size) for _ in range(players - 1)), rules) for _ in range(situations)]
+
+
+def benchmark(max_players=12, games=200, repeat=3):
+    """
+    Print the time per turn in games of Forrest against itself, and the time to generate the legal moves for
+    the situations from these games and for random situations with 8 cards in the hand. Each time is the best
+    of `repeat` runs.
+    """
+    print("             time per turn          move generation, per situation / per move")
+    print("players     cached   uncached        in games              8 card hands")
+    for players in range(2, max_players + 1):
+        cached = min(time_games(players, games, INTERACTIVE_LEGAL_MOVE_CACHE_SIZE) for _ in range(repeat))
+        uncached = min(time_games(players, games) for _ in range(repeat))
+        in_games = min(time_move_generation(game_situations(players, games)) for _ in range(repeat))
+        samples = random_situations(players, games * 10)
+        fixed = min(time_move_generation(samples) for _ in range(repeat))
+        print(f"""{players:7} {cached*1e6:7.1f} µs {uncached*1e6:7.1f} µs {in_games[0]*1e6:7.1f} / {
+            in_games[1]*1e6:4.2f} µs {fixed[0]*1e6:7.1f} / {fixed[1]*1e6:4.2f} µs""")
+    set_legal_move_cache_size(DEFAULT_LEGAL_MOVE_CACHE_SIZE)
+
+
+if __name__ == '__main__':
+    benchmark(*(int(arg) for arg in sys.argv[1:]))
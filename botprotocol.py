@@ -0,0 +1,364 @@
+# Play the primes game
+# This module lets bots run in separate processes and talk to the engine over a line-delimited JSON protocol
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+#
+# Protocol: the engine writes one JSON object per line to the bot's stdin:
+#     {"requests": [request, ...]}
+# and the bot answers with one line per batch on its stdout:
+#     {"responses": [{"id": ..., "move": i}, ...]}
+# where `i` is an index into the request's `legal_moves`. A request looks like this:
+#     {"id": 17, "bot": 2, "game": 5,
+#      "events": [{"type": "played", "player": "Forrest", "cards": [[3, 5]], "revealed": true},
+#                 {"type": "draw", "player": "Forrest"},
+#                 {"type": "top", "number": 7}],
+#      "state": {"name": "External", "position": 12, "hand": [[1, 2], [4, 7]],
+#                "opponents": [{"name": "Forrest", "position": 20, "cards": [0, 3, 9]}],
+#                "top_of_deck": 7,
+#                "legal_moves": [[[], false], [[0], false], [[1], false]]}}
+# `bot` identifies the proxy player and `game` changes whenever that player starts a new game, so a bot process
+# can keep per-game state for every proxy it serves. `events` are the Information objects the proxy received
+# since its last request. A bot process may serve any number of proxies and must answer every request in a batch.
+
+import asyncio
+import collections
+import itertools
+import json
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+
+from players import *
+
+
+class BotCrashed(Exception):
+    """
+    The bot process died or sent something we couldn't understand.
+    """
+
+
+def encode_card(card):
+    return [card.number, card.symbol]
+
+
+def encode_information(info: Information):
+    """
+    Convert an Information object to its JSON representation.
+    :param info: an Information object
+    :return: a dict or None if the event doesn't need to be forwarded
+    """
+    if isinstance(info, CardsPlayedInfo):
+        return {"type": "played",
+                "player": info.opponent.name,
+                "cards": [encode_card(card) if isinstance(card, Card) else card for card in info.cards_played],
+                "revealed": any(isinstance(card, Card) for card in info.cards_played)}
+    elif isinstance(info, CardDrawInfo):
+        return {"type": "draw", "player": info.player.name}
+    elif isinstance(info, TopOfDeckInfo):
+        return {"type": "top", "number": info.number}
+    return None
+
+
+class BotProcess:
+    """
+    One persistent bot process. Requests are written as batches, responses are read by a background thread
+    and delivered through `concurrent.futures.Future` objects so that any event loop can wait for them.
+    """
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, bufsize=1)
+        reader = threading.Thread(target=self._read_responses, args=(self.process,), daemon=True)
+        reader.start()
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def restart(self):
+        self.kill()
+        self.start()
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        self._fail_pending(self.process)
+
+    def send(self, requests):
+        """
+        Send a batch of requests.
+        :param requests: list of (request dict, Future) tuples
+        :return: None
+        """
+        if not self.alive():
+            self.restart()
+        with self.lock:
+            for request, future in requests:
+                self.pending[request["id"]] = (self.process, future)
+        try:
+            self.process.stdin.write(json.dumps({"requests": [request for request, _ in requests]}) + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            self._fail_pending(self.process)
+
+    def _read_responses(self, process):
+        for line in process.stdout:
+            try:
+                responses = json.loads(line)["responses"]
+            except (ValueError, KeyError, TypeError):
+                break
+            for response in responses:
+                with self.lock:
+                    entry = self.pending.pop(response.get("id"), None)
+                if entry and not entry[1].done():
+                    entry[1].set_result(response)
+        self._fail_pending(process)
+
+    def _fail_pending(self, process):
+        """
+        Fail all requests that were sent to `process`.
+        """
+        with self.lock:
+            failed = [request_id for request_id, (p, _) in self.pending.items() if p is process]
+            futures = [self.pending.pop(request_id)[1] for request_id in failed]
+        for future in futures:
+            if not future.done():
+                future.set_exception(BotCrashed(f"Bot process {' '.join(self.command)} died."))
+
+
+class BotPool:
+    """
+    A warm pool of persistent bot processes all running the same command.
+    Requests issued during one iteration of the event loop are sent to each process as a single batch.
+    """
+    def __init__(self, command, size=1):
+        """
+        :param command: command line (list of strings) that starts a bot process
+        :param size: number of processes to keep running
+        """
+        assert size >= 1, "A bot pool needs at least one process."
+        self.processes = [BotProcess(command) for _ in range(size)]
+        self.outboxes = [[] for _ in range(size)]
+        self.flush_scheduled = False
+        self.request_ids = itertools.count()
+        self.next_process = itertools.cycle(range(size))
+
+    def assign(self):
+        """
+        :return: the index of the process that should serve a new proxy
+        """
+        return next(self.next_process)
+
+    def submit(self, index, request):
+        """
+        Queue a request for the process with the given index. Must be called from a running event loop.
+        :param index: a process index as returned by `assign()`
+        :param request: request dict without the "id" field
+        :return: a `concurrent.futures.Future` that resolves to the response dict
+        """
+        request["id"] = next(self.request_ids)
+        future = Future()
+        self.outboxes[index].append((request, future))
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+        return future
+
+    def flush(self):
+        self.flush_scheduled = False
+        for process, outbox in zip(self.processes, self.outboxes):
+            if outbox:
+                process.send(outbox[:])
+                outbox.clear()
+
+    def restart(self, index):
+        self.processes[index].restart()
+
+    def close(self):
+        for process in self.processes:
+            if process.alive():
+                process.process.stdin.close()
+        for process in self.processes:
+            try:
+                process.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+            process.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ExternalBot(Player):
+    """
+    A proxy for a bot running in a `BotPool` process. If the bot crashes, sends an illegal move or
+    doesn't answer within `timeout` seconds, its process is restarted and the proxy passes.
+    """
+    bot_ids = itertools.count()
+
+    def __init__(self, pool, base_name=None, timeout=5.0):
+        self.pool = pool
+        self.timeout = timeout
+        self.bot_id = next(ExternalBot.bot_ids)
+        self.process_index = pool.assign()
+        self.game_id = -1
+        self.failures = 0
+        super().__init__(base_name)
+
+    def _default_name(self) -> str:
+        return "External"
+
+    def reset(self):
+        super().reset()
+        self.game_id += 1
+        self.events = []
+        self.top_of_deck = None
+
+    def _encode_state(self, opponents, legal_moves):
+        index = {id(card): i for i, card in enumerate(self.hand)}
+        return {"name": self.name,
+                "position": self.position,
+                "hand": [encode_card(card) for card in self.hand],
+                "opponents": [{"name": opponent.name,
+                               "position": opponent.position,
+                               "cards": opponent.reveal_card_numbers()} for opponent in opponents],
+                "top_of_deck": self.top_of_deck,
+                "legal_moves": [[[index[id(card)] for card in cards], revealed] for cards, revealed in legal_moves]}
+
+    async def _choose_cards_to_play(self, opponents):
+        legal_moves = self.legal_moves(opponents)
+        request = {"bot": self.bot_id,
+                   "game": self.game_id,
+                   "events": self.events,
+                   "state": self._encode_state(opponents, legal_moves)}
+        self.events = []
+        future = self.pool.submit(self.process_index, request)
+        try:
+            response = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            return legal_moves[response["move"]]
+        except asyncio.TimeoutError:
+            self.pool.restart(self.process_index)
+        except (BotCrashed, KeyError, IndexError, TypeError):
+            pass
+        self.failures += 1
+        return legal_moves[0]
+
+    def receive_information(self, info: Information):
+        if isinstance(info, TopOfDeckInfo):
+            self.top_of_deck = info.number
+        if isinstance(info, GameOverInfo):
+            self.game_over = True
+            self.events = []
+            return
+        event = encode_information(info)
+        if event is not None:
+            self.events.append(event)
+
+
+def run_games(games):
+    """
+    Play several games concurrently in one event loop so that requests to external bots get batched.
+    The games must not share Player objects.
+    :param games: list of Game objects
+    :return: None
+    """
+    async def play_all():
+        await asyncio.gather(*(game.gameplay() for game in games))
+    asyncio.run(play_all())
+
+
+class RemoteOpponent(Player):
+    """
+    What a bot process knows about an opponent: name, position and the numbers on the backs of the cards.
+    """
+    def __init__(self, name):
+        super().__init__(name)
+
+    def _default_name(self) -> str:
+        return "Opponent"
+
+    async def _choose_cards_to_play(self, opponents):
+        raise NotImplementedError("Remote opponents are played by the engine.")
+
+    def receive_information(self, info: Information):
+        pass
+
+
+def serve(player, input_stream=None, output_stream=None):
+    """
+    Run a Python `Player` subclass as a bot process, answering requests from `input_stream` until EOF.
+    Output of the bot itself is redirected to stderr so it doesn't interfere with the protocol.
+    :param player: PlayerSpec or Player subclass of the bot; a new player is created for each game
+    :param input_stream: file to read requests from, default stdin
+    :param output_stream: file to write responses to, default stdout
+    :return: None
+    """
+    spec = as_spec(player)
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    sys.stdout = sys.stderr
+    loop = asyncio.new_event_loop()
+    games = {}  # bot id -> (game id, player, opponents by name)
+
+    def decode_card(card):
+        return Card(*card) if isinstance(card, list) else card
+
+    def answer(request):
+        state = request["state"]
+        game_id, player, opponents = games.get(request["bot"], (None, None, None))
+        if game_id != request["game"]:
+            player = spec.create()
+            player.name = state["name"]
+            opponents = {}
+            games[request["bot"]] = (request["game"], player, opponents)
+        for opponent_state in state["opponents"]:
+            opponent = opponents.setdefault(opponent_state["name"], RemoteOpponent(opponent_state["name"]))
+            opponent.position = opponent_state["position"]
+            opponent.hand = [Card(number, None) for number in opponent_state["cards"]]
+        for event in request["events"]:
+            if event["type"] == "played":
+                info = CardsPlayedInfo(opponents[event["player"]], [decode_card(card) for card in event["cards"]])
+            elif event["type"] == "draw":
+                info = CardDrawInfo(opponents[event["player"]])
+            else:
+                info = TopOfDeckInfo(event["number"])
+            player.receive_information(info)
+        # hand the new cards over with receive_card(), so that bots keeping track of their own cards see them
+        new_cards = collections.Counter(tuple(card) for card in state["hand"])
+        kept = []
+        for card in player.hand:
+            if new_cards[(card.number, card.symbol)] > 0:
+                new_cards[(card.number, card.symbol)] -= 1
+                kept.append(card)
+        player.hand = kept
+        for (number, symbol), count in new_cards.items():
+            for _ in range(count):
+                player.receive_card(Card(number, symbol))
+        player.set_position(state["position"])
+        current_opponents = [opponents[opponent_state["name"]] for opponent_state in state["opponents"]]
+        cards, revealed = loop.run_until_complete(player._choose_cards_to_play(current_opponents))
+        chosen = sorted(next(i for i, card in enumerate(player.hand) if card is c) for c in cards)
+        for card in cards:
+            player.hand.remove(card)
+        legal_moves = [(sorted(js), r) for js, r in state["legal_moves"]]
+        return {"id": request["id"], "move": legal_moves.index((chosen, revealed))}
+
+    for line in input_stream:
+        responses = [answer(request) for request in json.loads(line)["requests"]]
+        output_stream.write(json.dumps({"responses": responses}) + "\n")
+        output_stream.flush()
+
+
+if __name__ == '__main__':
+    assert len(sys.argv) == 2, "Usage: python botprotocol.py [module.]<Player class name>"
+    serve(PlayerSpec.of(sys.argv[1]))
@@ -0,0 +1,204 @@
+# Play the primes game
+# This module contains a curses front end for text mode play
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import asyncio
+import curses
+import sys
+
+from players import *
+
+
+class CursesHuman(Human):
+    """
+    Text mode play in a curses screen. The screen is divided into regions (status, hand, moves, log) and only
+    regions whose content changed are redrawn; curses then sends just the differences to the terminal.
+    Keys are read without blocking the event loop. Select a move with the arrow keys (or j/k, or its number)
+    and press Enter.
+    """
+    def __init__(self, base_name=None):
+        super().__init__(base_name)
+        self.screen = None
+        self.windows = {}
+        self.rendered = {}
+        self.log = []
+        self.status_height = 3
+
+    def _default_name(self):
+        return "Human"
+
+    def reset(self):
+        super().reset()
+        self.top_of_deck = None
+
+    def _start(self, opponents):
+        self.status_height = 3 + len(opponents)
+        self.screen = curses.initscr()
+        curses.noecho()
+        curses.cbreak()
+        self.screen.keypad(True)
+        self.screen.nodelay(True)
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        self._layout()
+
+    def _stop(self):
+        if self.screen is not None:
+            self.screen.keypad(False)
+            curses.nocbreak()
+            curses.echo()
+            curses.endwin()
+            self.screen = None
+
+    def _layout(self):
+        """
+        (Re)create the regions for the current terminal size.
+        """
+        height, width = self.screen.getmaxyx()
+        status_height = self.status_height
+        moves_height = max(3, (height - status_height - 2) // 2)
+        log_height = max(1, height - status_height - 2 - moves_height)
+        self.windows = {
+            "status": curses.newwin(status_height, width, 0, 0),
+            "hand": curses.newwin(2, width, status_height, 0),
+            "moves": curses.newwin(moves_height, width, status_height + 2, 0),
+            "log": curses.newwin(log_height, width, status_height + 2 + moves_height, 0),
+        }
+        self.rendered = {}
+        self.screen.clear()
+        self.screen.noutrefresh()
+
+    def _draw(self, name, lines, highlight=None):
+        """
+        Redraw a region if its content changed.
+        :param name: the region
+        :param lines: list of strings
+        :param highlight: index of a line to show in reverse video
+        :return: None
+        """
+        window = self.windows[name]
+        height, width = window.getmaxyx()
+        lines = [line[:width - 1] for line in lines[:height]]
+        if self.rendered.get(name) == (lines, highlight):
+            return
+        self.rendered[name] = (lines, highlight)
+        window.erase()
+        for y, line in enumerate(lines):
+            try:
+                window.addstr(y, 0, line, curses.A_REVERSE if y == highlight else curses.A_NORMAL)
+            except curses.error:
+                pass
+        window.noutrefresh()
+
+    def _refresh(self):
+        curses.doupdate()
+
+    def _draw_log(self):
+        height, _ = self.windows["log"].getmaxyx()
+        self._draw("log", self.log[-height:])
+
+    def _draw_state(self, opponents, legal_moves, selected):
+        status = [f"Grant's Game ({VERSION})",
+                  f"You are on square {self.position_with_hints()}",
+                  f"Top of deck: {'empty' if self.top_of_deck is None else self.top_of_deck}"]
+        for opponent in opponents:
+            numbers = opponent.reveal_card_numbers()
+            status.append(f"""{opponent.name} is on square {opponent.position_with_hints()}, holding {
+                ' '.join(str(number) for number in numbers) if numbers else 'no cards'}""")
+        self._draw("status", status)
+        self._draw("hand", ["Your cards:", ", ".join(str(card) for card in self.hand)])
+
+        height, _ = self.windows["moves"].getmaxyx()
+        first = max(0, min(selected - height // 2, len(legal_moves) - height))
+        lines = []
+        for i, (cards, revealed) in enumerate(legal_moves[first:first + height], first):
+            lines.append(f"""{i:3}: {'pass' if not cards else 'play revealed' if revealed else 'play'} {
+                ' '.join(str(card) for card in cards)}""")
+        self._draw("moves", lines, selected - first)
+        self._draw_log()
+        self._refresh()
+
+    async def _read_keys(self):
+        """
+        Wait until keys are available and return them, without blocking the event loop.
+        :return: list of key codes
+        """
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        try:
+            loop.add_reader(sys.stdin.fileno(), ready.set)
+            try:
+                await ready.wait()
+            finally:
+                loop.remove_reader(sys.stdin.fileno())
+        except (NotImplementedError, ValueError, OSError):
+            # event loops without add_reader (e.g. on Windows): poll
+            await asyncio.sleep(0.02)
+        keys = []
+        while True:
+            key = self.screen.getch()
+            if key == -1:
+                return keys
+            keys.append(key)
+
+    async def _choose_cards_to_play(self, opponents):
+        if self.screen is None:
+            self._start(opponents)
+        try:
+            move = await self._select_move(opponents)
+        except BaseException:
+            self._stop()
+            raise
+        self.log.append(f"""You {'pass' if not move.cards else 'reveal' if move.revealed else 'play'} {
+            ' '.join(str(card) for card in move.cards)}""")
+        return move
+
+    async def _select_move(self, opponents):
+        legal_moves = self.legal_moves(opponents)
+        selected = 0
+        number = ""
+        self.log.append(f"*** {self.name}, it's your move.")
+        while True:
+            self._draw_state(opponents, legal_moves, selected)
+            for key in await self._read_keys():
+                if key == curses.KEY_RESIZE:
+                    self._layout()
+                elif key in (curses.KEY_UP, ord('k')):
+                    selected = max(0, selected - 1)
+                elif key in (curses.KEY_DOWN, ord('j')):
+                    selected = min(len(legal_moves) - 1, selected + 1)
+                elif key == curses.KEY_PPAGE:
+                    selected = max(0, selected - self.windows["moves"].getmaxyx()[0])
+                elif key == curses.KEY_NPAGE:
+                    selected = min(len(legal_moves) - 1, selected + self.windows["moves"].getmaxyx()[0])
+                elif ord('0') <= key <= ord('9'):
+                    number += chr(key)
+                    if int(number) < len(legal_moves):
+                        selected = int(number)
+                    else:
+                        number = chr(key)
+                        selected = min(int(number), len(legal_moves) - 1)
+                    continue
+                elif key in (curses.KEY_ENTER, 10, 13):
+                    return legal_moves[selected]
+                number = ""
+
+    def receive_information(self, info: Information):
+        if isinstance(info, CardsPlayedInfo):
+            self.log.append(f"""{info.opponent.name} has just played {
+                ' '.join(str(card) for card in info.cards_played) if info.cards_played else 'pass'}""")
+        elif isinstance(info, CardDrawInfo):
+            self.log.append(f"{info.player.name} has drawn a card.")
+        elif isinstance(info, TopOfDeckInfo):
+            self.top_of_deck = info.number
+        else:
+            assert(isinstance(info, GameOverInfo))
+            self.game_over = True
+            self._stop()
+            return
+        if self.screen is not None:
+            self._draw_log()
+            self._refresh()
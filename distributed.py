@@ -0,0 +1,251 @@
+# Play the primes game
+# This module runs a tournament on many machines: a coordinator hands out batches of games to workers over TCP
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+#
+# Protocol: one JSON object per line in both directions.
+# A worker connects and introduces itself:        {"type": "hello", "worker": "host-1234"}
+# The coordinator sends a batch of games:         {"type": "batch", "id": 17, "games": 100, "seed": 12345,
+#                                                  "players": [spec, ...], "rules": rules}
+# and the worker answers with the aggregated statistics of the batch (see `Tournament.statistics()`):
+#                                                 {"type": "result", "id": 17, "statistics": {...}}
+# When all batches are done the coordinator sends {"type": "stop"}.
+# A player spec looks like {"class": "Wary", "module": "belief", "name": null, "params": {}} and the rules like
+# the arguments of `Rules()`. Each batch is played with its own seed, so the results don't depend on which
+# worker plays which batch, and a batch that is lost with its worker can simply be played again.
+
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+
+from main import *
+
+
+def spec_to_json(spec):
+    return {"class": spec.class_name, "module": spec.module, "name": spec.name, "params": dict(spec.params)}
+
+
+def spec_from_json(data):
+    return PlayerSpec(data["class"], tuple(sorted(data["params"].items())), data["module"], data["name"])
+
+
+def rules_to_json(rules):
+    state = rules.__getstate__()
+    state["card_dict"] = [[number, list(symbols)] for number, symbols in state["card_dict"].items()]
+    return state
+
+
+def rules_from_json(data):
+    return Rules(**{**data, "card_dict": {number: symbols for number, symbols in data["card_dict"]}})
+
+
+def play_batch(specs, rules, games, seed):
+    """
+    Play a batch of games with fresh players.
+    :param specs: PlayerSpecs, one per seat
+    :param rules: the Rules
+    :param games: number of games
+    :param seed: random seed
+    :return: `Tournament.statistics()` of the batch
+    """
+    random.seed(seed)
+    t = Tournament.from_specs(*specs, rules=rules)
+    t.run(games)
+    return t.statistics()
+
+
+class Coordinator:
+    """
+    Splits `games` games into seeded batches and hands them out to the workers that connect. Results are added
+    to `self.tournament` as they come in. A batch whose worker disconnects or doesn't answer within
+    `batch_timeout` seconds goes back into the queue. When the queue is empty, idle workers also play batches
+    that are still running elsewhere, so a slow worker can't hold up the end; whichever result comes first counts.
+    """
+    def __init__(self, *players, games, rules=DEFAULT_RULES, batch_size=100, host="127.0.0.1", port=0, seed=None,
+                 batch_timeout=600.0):
+        """
+        :param players: PlayerSpecs or Player subclasses, one per seat
+        :param games: total number of games
+        :param rules: the Rules to play by
+        :param batch_size: number of games in one batch
+        :param host: interface to listen on, default is local connections only. Workers on other machines need
+            e.g. "0.0.0.0" for all IPv4 interfaces; anyone who can connect gets batches and can send results,
+            so only do this on a network you trust.
+        :param port: TCP port, 0 picks a free one (see `self.port` once `serve()` runs)
+        :param seed: random seed; the results are reproducible no matter how many workers take part
+        :param batch_timeout: seconds to wait for a batch before giving it to another worker, None waits forever
+        """
+        self.specs = [as_spec(player) for player in players]
+        self.tournament = Tournament.from_specs(*self.specs, rules=rules)
+        self.rules = rules
+        self.host = host
+        self.port = port
+        self.batch_timeout = batch_timeout
+        rng = random.Random(seed)
+        self.batches = {}  # id -> (games, seed)
+        for i, start in enumerate(range(0, games, batch_size)):
+            self.batches[i] = (min(batch_size, games - start), rng.getrandbits(64))
+        self.queue = collections.deque(self.batches)
+        self.running = {}  # id -> number of workers playing it
+        self.done = set()
+        self.finished = None
+        self.workers = 0
+        self.connections = {}  # writer -> task handling that worker
+        self.reassigned = 0
+        self.verbose = False
+
+    def set_verbose(self, verbose):
+        self.verbose = verbose
+
+    def next_batch(self):
+        """
+        :return: the id of the batch to hand out next, None if there is nothing left to do
+        """
+        while self.queue:
+            batch = self.queue.popleft()
+            if batch not in self.done:
+                return batch
+        unfinished = [batch for batch in self.batches if batch not in self.done]
+        if not unfinished:
+            return None
+        # nothing queued, so help with the batch that has the fewest workers
+        return min(unfinished, key=lambda batch: self.running.get(batch, 0))
+
+    async def handle_worker(self, reader, writer):
+        self.workers += 1
+        self.connections[writer] = asyncio.current_task()
+        worker = "?"
+        batch = None
+        try:
+            worker = json.loads(await reader.readline())["worker"]
+            while (batch := self.next_batch()) is not None:
+                games, seed = self.batches[batch]
+                self.running[batch] = self.running.get(batch, 0) + 1
+                writer.write((json.dumps({"type": "batch", "id": batch, "games": games, "seed": seed,
+                                          "players": [spec_to_json(spec) for spec in self.specs],
+                                          "rules": rules_to_json(self.rules)}) + "\n").encode())
+                await writer.drain()
+                line = await asyncio.wait_for(reader.readline(), self.batch_timeout)
+                if not line:
+                    raise ConnectionError(f"Worker {worker} disconnected.")
+                result = json.loads(line)
+                self.running[batch] -= 1
+                if result["id"] not in self.done:
+                    self.done.add(result["id"])
+                    self.tournament.add_statistics(result["statistics"])
+                    if self.verbose:
+                        print(f"""Batch {result['id']} from {worker}: {self.tournament.games_played} games, {
+                            len(self.done)}/{len(self.batches)} batches done""")
+                batch = None
+                if len(self.done) == len(self.batches):
+                    self.finished.set()
+            writer.write((json.dumps({"type": "stop"}) + "\n").encode())
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError, ValueError, KeyError) as e:
+            if batch is not None:
+                self.running[batch] -= 1
+                if batch not in self.done:
+                    self.queue.appendleft(batch)
+                    self.reassigned += 1
+                    if self.verbose:
+                        print(f"Lost batch {batch} from worker {worker}: {e!r}")
+        finally:
+            self.workers -= 1
+            del self.connections[writer]
+            writer.close()
+
+    async def serve(self):
+        """
+        Accept workers until all batches are done.
+        :return: the Tournament with the results of all games
+        """
+        self.finished = asyncio.Event()
+        if not self.batches:
+            return self.tournament
+        server = await asyncio.start_server(self.handle_worker, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        if self.verbose:
+            print(f"Coordinator listening on {self.host} port {self.port}, {len(self.batches)} batches to play")
+        async with server:
+            await self.finished.wait()
+        # workers still busy with a duplicate batch see the connection close and stop
+        for writer in list(self.connections):
+            writer.close()
+        await asyncio.gather(*self.connections.values(), return_exceptions=True)
+        return self.tournament
+
+    def run(self):
+        return asyncio.run(self.serve())
+
+
+def work(host, port, name=None, retry=30.0):
+    """
+    Play batches for a coordinator until it says stop or goes away.
+    :param host: the coordinator's host name or address
+    :param port: the coordinator's port
+    :param name: name of this worker for the coordinator's log, default is host name and process id
+    :param retry: keep trying to connect this many seconds, so workers can be started before the coordinator
+    :return: number of batches played
+    """
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    deadline = time.monotonic() + retry
+    while True:
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+    batches = 0
+    with connection, connection.makefile("rw") as stream:
+        stream.write(json.dumps({"type": "hello", "worker": name}) + "\n")
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            if message["type"] == "stop":
+                break
+            statistics = play_batch([spec_from_json(spec) for spec in message["players"]],
+                                    rules_from_json(message["rules"]), message["games"], message["seed"])
+            stream.write(json.dumps({"type": "result", "id": message["id"], "statistics": statistics}) + "\n")
+            stream.flush()
+            batches += 1
+    return batches
+
+
+def start_workers(host, port, processes=None):
+    """
+    Start worker processes on this machine.
+    :param processes: number of processes, default is the number of CPUs
+    :return: list of multiprocessing.Process objects
+    """
+    workers = [multiprocessing.Process(target=work, args=(host, port), daemon=True)
+               for _ in range(processes or os.cpu_count())]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+if __name__ == '__main__':
+    usage = """Usage: python distributed.py coordinator [<interface>:]<port> <games> [module.]<Player class> ...
+       python distributed.py worker <host> <port> [<processes>]
+The coordinator only accepts local workers unless you give an interface, e.g. 0.0.0.0:9000 for all of them."""
+    assert len(sys.argv) >= 3 and sys.argv[1] in ("coordinator", "worker"), usage
+    if sys.argv[1] == "coordinator":
+        assert len(sys.argv) >= 6, usage
+        host, _, port = sys.argv[2].rpartition(":")
+        coordinator = Coordinator(*(PlayerSpec.of(name) for name in sys.argv[4:]), games=int(sys.argv[3]),
+                                  host=host or "127.0.0.1", port=int(port))
+        coordinator.set_verbose(True)
+        start = time.monotonic()
+        coordinator.run().print_results()
+        print(f"{time.monotonic() - start:.1f} s, {coordinator.reassigned} batches reassigned")
+    else:
+        for process in start_workers(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]) if len(sys.argv) > 4 else None):
+            process.join()
@@ -0,0 +1,92 @@
+# Play the primes game
+# This module turns game states and moves into fixed-size NumPy feature vectors for learning bots
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import numpy as np
+
+from players import *
+
+# every distinct (number, symbol) pair in the deck
+CARD_TYPES = sorted({(number, symbol) for number, symbols in cardDict.items() for symbol in symbols})
+CARD_TYPE_INDEX = {card_type: i for i, card_type in enumerate(CARD_TYPES)}
+NUMBERS = sorted(cardDict)
+DECK_SIZE = sum(len(symbols) for symbols in cardDict.values())
+MAX_OPPONENTS = 3
+BOARD_SIZE = 100
+
+# layout of the state vector
+OPPONENT_FEATURES = 3 + len(NUMBERS)  # present, position, hand size, card counts per number
+STATE_FEATURES = 1 + len(CARD_TYPES) + MAX_OPPONENTS * OPPONENT_FEATURES + 2 + len(NUMBERS)
+# layout of the move vector
+MOVE_FEATURES = len(CARD_TYPES) + 8
+
+
+def encode_state(position, hand, opponents, cards_in_deck, top_of_deck, out=None):
+    """
+    Encode what a player knows when it has to move.
+    Layout: own position, own hand as counts per card type, for each of MAX_OPPONENTS opponent slots
+    (present, position, hand size, counts per number on the card backs), cards left in the deck,
+    deck empty, top of deck one-hot per number. Positions are divided by the board size, counts are raw.
+    :param position: the player's position
+    :param hand: list of Card objects
+    :param opponents: list of Player objects in playing order; only the first MAX_OPPONENTS are encoded
+    :param cards_in_deck: number of cards left in the deck
+    :param top_of_deck: the number on the top card or None if the deck is empty
+    :param out: optional float32 array of length STATE_FEATURES to write into
+    :return: the feature vector
+    """
+    x = np.zeros(STATE_FEATURES, dtype=np.float32) if out is None else out
+    if out is not None:
+        x[:] = 0.0
+    x[0] = position / BOARD_SIZE
+    offset = 1
+    for card in hand:
+        x[offset + CARD_TYPE_INDEX[(card.number, card.symbol)]] += 1
+    offset += len(CARD_TYPES)
+    for opponent in opponents[:MAX_OPPONENTS]:
+        numbers = opponent.reveal_card_numbers()
+        x[offset] = 1.0
+        x[offset + 1] = opponent.position / BOARD_SIZE
+        x[offset + 2] = len(numbers)
+        for number in numbers:
+            x[offset + 3 + number] += 1
+        offset += OPPONENT_FEATURES
+    offset = 1 + len(CARD_TYPES) + MAX_OPPONENTS * OPPONENT_FEATURES
+    x[offset] = cards_in_deck / DECK_SIZE
+    if top_of_deck is None:
+        x[offset + 1] = 1.0
+    else:
+        x[offset + 2 + top_of_deck] = 1.0
+    return x
+
+
+def encode_move(move, out=None):
+    """
+    Encode a candidate move.
+    Layout: cards played as counts per card type, pass, revealed, distance, landing square, landing square is
+    prime, number of opponents set back, total distance opponents are set back, leading after the move.
+    :param move: a Move from `Player.legal_moves()`
+    :param out: optional float32 array of length MOVE_FEATURES to write into
+    :return: the feature vector
+    """
+    x = np.zeros(MOVE_FEATURES, dtype=np.float32) if out is None else out
+    if out is not None:
+        x[:] = 0.0
+    cards, revealed = move
+    for card in cards:
+        x[CARD_TYPE_INDEX[(card.number, card.symbol)]] += 1
+    delta = move.delta
+    targets = move.targets
+    landing = move.position
+    offset = len(CARD_TYPES)
+    x[offset] = not cards
+    x[offset + 1] = revealed
+    x[offset + 2] = delta / BOARD_SIZE
+    x[offset + 3] = landing / BOARD_SIZE
+    x[offset + 4] = len(DEFAULT_RULES.factors[landing]) == 1
+    x[offset + 5] = len(targets)
+    x[offset + 6] = delta * len(targets) / BOARD_SIZE
+    x[offset + 7] = all(landing > opponent_position
+                        for opponent_position in (move.opponent_positions if targets else move.opponent_starts))
+    return x
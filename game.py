@@ -8,11 +8,32 @@ from players import *
 from carddict import cardDict
 
 
+def new_deck(rules=DEFAULT_RULES):
+    """
+    :param rules: the Rules defining the deck
+    :return: a freshly shuffled deck. The top of the deck is the end of the list.
+    """
+    deck = [Card(number, symbol) for number, symbol in rules.deck]
+    random.shuffle(deck)
+    return deck
+
+
 class Game:
-    def __init__(self, *players):
+    def __init__(self, *players, deck=None, rules=DEFAULT_RULES, analytics=None, spectator=None):
+        """
+        :param players: the players in playing order. Strings are turned into text mode Human players.
+        :param deck: a list of cards to play with, top of the deck last. Default is a freshly shuffled deck.
+            The list is copied, so the same deck can be dealt again in another game.
+        :param rules: the Rules to play by
+        :param analytics: optional AnalyticsCollector (see analytics.py) that records the movements in this game
+        :param spectator: optional Spectator (see spectator.py) that receives a frame after every move
+        """
         assert len(players) >= 2, "The number of players must be at least 2."
 
         self.verbose = False
+        self.rules = rules
+        self.analytics = analytics
+        self.spectator = spectator
         # self.players = [player if isinstance(player, Player) else Human(player) for player in players]
         self.players = []
         self.human_present = False
@@ -28,18 +49,27 @@ class Game:
                 assert not self.human_present, "Can't combine GUI with text mode Human."
                 self.GUI_player = player
             self.players.append(player)
+        assign_names(self.players)
+
+        if analytics is not None:
+            assert analytics.board_size == rules.board_size, \
+                f"The analytics collector is for {analytics.board_size} squares, the board has {rules.board_size}."
+        if spectator is not None:
+            assert rules.board_size == 100 and rules.card_dict == DEFAULT_RULES.card_dict, \
+                "The spectator view presently only supports the standard board and deck."
 
         self.input_queue = None
         self.output_queue = None
         self.should_exit = False
         if self.GUI_player:
             assert len(self.players) == 2, "GUI presently only supports exactly one opponent."
+            assert rules.board_size == 100 and rules.card_dict == DEFAULT_RULES.card_dict, \
+                "GUI presently only supports the standard board and deck."
             self.input_queue = asyncio.Queue()
             self.output_queue = asyncio.Queue()
             self.GUI_player.connect_queues(self.input_queue, self.output_queue)
 
-        self.deck = [Card(number, symbol) for number, primes in cardDict.items() for symbol in primes]
-        random.shuffle(self.deck)
+        self.deck = new_deck(rules) if deck is None else list(deck)
 
         self.number_of_setbacks = 0
         self.number_of_turns = 0
@@ -100,29 +130,62 @@ class Game:
         else:
             player.receive_information(TopOfDeckInfo(None))
 
-    async def gameplay(self):
-        for player in self.players:
+    def setup(self, hands, positions):
+        """
+        Put the players into a situation in the middle of a game instead of dealing, e.g. for simulations.
+        Continue with `gameplay(deal=False)`. The remaining cards are `self.deck`.
+        :param hands: one list of Card objects per player, in playing order
+        :param positions: one position per player, in playing order
+        :return: None
+        """
+        assert len(hands) == len(positions) == len(self.players), "Need a hand and a position for every player."
+        for player, hand, position in zip(self.players, hands, positions):
+            player.rules = self.rules
             player.reset()
-        # deal one card to each player
-        for player in self.players:
-            self._draw_for_player(player)
-        self.number_of_passes = 0
-        continue_move = False
-        all_cards_played = []
+            for card in hand:
+                player.receive_card(card)
+            player.set_position(position)
+
+    async def gameplay(self, deal=True, cards_played_this_turn=None, passes=0):
+        """
+        Play the game.
+        :param deal: False to go on from the situation created by `setup()`
+        :param cards_played_this_turn: if the first player is in the middle of a turn because they revealed cards,
+            the cards they have played so far this turn
+        :param passes: number of consecutive passes just before the first player's turn
+        :return: None
+        """
+        if deal:
+            for player in self.players:
+                player.rules = self.rules
+                player.reset()
+            for _ in range(self.rules.starting_hand):
+                for player in self.players:
+                    self._draw_for_player(player)
+        self.number_of_passes = passes
+        continue_move = cards_played_this_turn is not None
+        all_cards_played = list(cards_played_this_turn or [])
+        analytics = self.analytics
+        spectator = self.spectator
+        turn_start = self.players[0].position
 
         for player in self.players:
             self.inform_about_top_of_deck(player)
+        if spectator is not None:
+            spectator.start_game(self)
 
         while self.number_of_passes < len(self.players):
             if not continue_move:
                 all_cards_played = []
                 self.number_of_turns += 1
+                turn_start = self.players[0].position
 
             player = self.players[0]
             opponents = self.players[1:]
             if self.verbose:
                 print(f"{player} to play.")
-            cards, revealed = await player.play_cards(opponents)
+            move = await player.play_cards(opponents)
+            cards, revealed = move
             cards_played = []
             if len(cards) == 0:
                 if self.verbose:
@@ -132,24 +195,24 @@ class Game:
                 continue_move = False
             else:
                 self.number_of_passes = 0
-                numbers = [card.number for card in cards]
-                delta = sum(numbers)
-                symbols = [card.symbol for card in cards]
-                can_setback = any(opponent.symbols_match(symbols) for opponent in opponents)
+                delta = move.delta
 
                 if revealed:
-                    assert can_setback, "Can't reveal cards unless setting back an opponent."  # RULE
-                    for opponent in opponents:
-                        if opponent.symbols_match(symbols):
-                            opponent.move(-delta)
-                            player.move(delta)  # RULE: move forward for each opponent that is set back
-                            self.number_of_setbacks += 1
-                    cards_played = cards
+                    assert move.targets, "Can't reveal cards unless setting back an opponent."  # RULE
+                    for k in move.targets:
+                        opponent = opponents[k]
+                        if analytics is not None:
+                            analytics.record_setback(opponent.position, opponent.position - delta)
+                        opponent.move(-delta)
+                        player.move(delta)  # RULE: move forward for each opponent that is set back
+                        self.number_of_setbacks += 1
+                    cards_played = list(cards)
                     continue_move = True
                 else:
+                    numbers = [card.number for card in cards]
                     assert len(set(numbers)) == 1, "Can't play different numbers unless setting back someone."  # RULE
                     player.move(delta)
-                    cards_played = [card.number for card in cards]
+                    cards_played = numbers
                     continue_move = False
                 all_cards_played += cards_played
                 if self.verbose:
@@ -157,15 +220,22 @@ class Game:
 
             for opponent in opponents:
                 opponent.receive_information(CardsPlayedInfo(player, cards_played))
+            if spectator is not None:
+                spectator.record(self, player, cards_played, revealed)
 
-            if player.position == 100:
+            if player.position == self.rules.board_size:
+                if analytics is not None:
+                    analytics.record_turn(turn_start, player.position)
                 break
 
             # RULE: If a player reveals cards, they can continue their move.
             # If they don't, they draw new cards and it's the next player's turn.
             if not continue_move:
+                if analytics is not None:
+                    analytics.record_turn(turn_start, player.position)
 
-                for _ in range(len(all_cards_played) + 1):  # RULE: draw one more card than played
+                # RULE: draw one more card than played (in the standard rules)
+                for _ in range(len(all_cards_played) + self.rules.extra_draw):
                     if self._draw_for_player(player):
                         for opponent in opponents:
                             opponent.receive_information(CardDrawInfo(player))
@@ -176,10 +246,14 @@ class Game:
                 self.players = opponents + [player]  # rotate players
 
         # game over.
+        if analytics is not None:
+            analytics.record_game()
         for player in self.players:
             player.receive_information(GameOverInfo())
         # Sort the players
         self.players.sort(key=lambda player: player.position, reverse=True)
+        if spectator is not None:
+            spectator.end_game(self)
         if self.GUI_player:
             self.GUI_player.output_queue.put_nowait("Game over. Result:")
             for player in self.players:
@@ -0,0 +1,392 @@
+# Play the primes game
+# This module estimates the win probability of each legal move in the background while a human is thinking
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import asyncio
+import copy
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import List, Tuple, Union
+
+from belief import BeliefTracker
+from game import *
+
+
+@dataclass
+class HintSituation:
+    """
+    Everything a player knows when it's their move, in a form that can be sent to worker processes.
+    """
+    rules: Rules
+    hand: List[Tuple[int, int]]
+    position: int
+    opponent_positions: List[int]
+    opponent_numbers: List[List[int]]
+    belief: BeliefTracker
+    cards_played_this_turn: Union[List[Tuple[int, int]], None]
+    passes: int
+
+
+class FirstMove(Player):
+    """
+    Play a given move, then let a policy player take over. The policy must not keep state between moves
+    (like Forrest or GreedyTortoise), because it only gets to see the hand and the position.
+    """
+    def __init__(self, move_key, policy):
+        """
+        :param move_key: the `key` of the first Move
+        :param policy: a Player object that chooses the following moves
+        """
+        self.move_key = move_key
+        self.policy = policy
+        super().__init__("Hint")
+
+    def _default_name(self) -> str:
+        return "Hint"
+
+    def reset(self):
+        super().reset()
+        self.policy.rules = self.rules
+        self.policy.reset()
+        self.first_move = True
+
+    async def _choose_cards_to_play(self, opponents):
+        if self.first_move:
+            self.first_move = False
+            return next(move for move in self.legal_moves(opponents) if move.key == self.move_key)
+        self.policy.hand = self.hand
+        self.policy.position = self.position
+        return await self.policy._choose_cards_to_play(opponents)
+
+    def receive_information(self, info: Information):
+        self.policy.receive_information(info)
+
+
+def rollout(situation, move_key, games, seed, policy):
+    """
+    Play `move_key` and finish the game with `policy` for everyone, `games` times, each time with the unseen cards
+    sampled from the belief state. This runs in a worker process, so the arguments must be picklable.
+    :param situation: a HintSituation
+    :param move_key: the `key` of the Move to evaluate
+    :param games: number of games
+    :param seed: random seed; using the same seed for all moves makes their estimates directly comparable
+    :param policy: PlayerSpec of the players that play on after the first move
+    :return: points scored, 1 for a win, shared in case of a tie
+    """
+    rng = random.Random(seed)
+    random.seed(seed)
+    loop = asyncio.new_event_loop()
+    player = FirstMove(move_key, policy.create())
+    opponents = [policy.create() for _ in situation.opponent_positions]
+    points = 0.0
+    try:
+        for _ in range(games):
+            hands, deck = situation.belief.sample_hidden(situation.opponent_numbers, rng)
+            game = Game(player, *opponents, deck=[Card(*card) for card in deck], rules=situation.rules)
+            game.setup([[Card(*card) for card in hand] for hand in [situation.hand] + hands],
+                       [situation.position] + situation.opponent_positions)
+            loop.run_until_complete(game.gameplay(deal=False,
+                                                  cards_played_this_turn=situation.cards_played_this_turn,
+                                                  passes=situation.passes))
+            best = game.players[0].position
+            if player.position == best:
+                points += 1 / sum(p.position == best for p in game.players)
+    finally:
+        loop.close()
+    return points
+
+
+class HintService:
+    """
+    Monte Carlo evaluation of all legal moves in a process pool. Estimates are reported after every round and
+    each round plays twice as many games as the one before, so the first rough estimate comes quickly.
+    Cancelling the task running `evaluate()` drops all queued work at once; jobs already running are small
+    and their results are ignored.
+    """
+    def __init__(self, policy=Forrest, first_round=25, rounds=4, workers=None, seed=None):
+        """
+        :param policy: PlayerSpec or Player subclass of the stateless bot that plays the games to the end
+        :param first_round: number of games per move in the first round
+        :param rounds: number of rounds
+        :param workers: number of worker processes, default is the number of CPUs
+        :param seed: random seed for reproducible hints
+        """
+        self.policy = as_spec(policy)
+        self.first_round = first_round
+        self.rounds = rounds
+        self.workers = workers
+        self.random = random.Random(seed)
+        self.executor = None
+
+    async def evaluate(self, situation, moves, report=None):
+        """
+        Evaluate moves until all rounds are done or the task is cancelled.
+        :param situation: a HintSituation
+        :param moves: the legal moves, a list of Move objects
+        :param report: optional function called with a list of (Move, win probability) tuples, best first,
+            and the number of games per move after each round
+        :return: the last list of (Move, win probability) tuples
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+        loop = asyncio.get_running_loop()
+        points = [0.0] * len(moves)
+        games = 0
+        ranking = []
+        for i in range(self.rounds):
+            batch = self.first_round << i
+            seed = self.random.getrandbits(64)
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self.executor, rollout, situation, move.key, batch, seed, self.policy)
+                for move in moves))
+            points = [total + result for total, result in zip(points, results)]
+            games += batch
+            ranking = sorted(((move, total / games) for move, total in zip(moves, points)),
+                             key=lambda entry: entry[1], reverse=True)
+            if report is not None:
+                report(ranking, games)
+        return ranking
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+class SituationTracker:
+    """
+    Mixin for players that evaluate their moves with a HintService: keeps a BeliefTracker and what else is
+    needed for `situation()`. Put it before the Player class in the list of base classes.
+    """
+    def __init__(self, *args, **kwargs):
+        self.belief = None  # made for the rules of the game in reset()
+        super().__init__(*args, **kwargs)
+
+    def reset(self):
+        super().reset()
+        self.belief = BeliefTracker.for_rules(self.rules, self.belief)
+        self.cards_played_this_turn = None
+        self.passes = 0
+        self.continuing = False  # whether the player who moved last revealed cards and is still on turn
+
+    def receive_card(self, card):
+        super().receive_card(card)
+        self.belief.observe_draw(card)
+
+    def situation(self, opponents):
+        return HintSituation(self.rules,
+                             [(card.number, card.symbol) for card in self.hand],
+                             self.position,
+                             [opponent.position for opponent in opponents],
+                             [opponent.reveal_card_numbers() for opponent in opponents],
+                             self.belief,
+                             self.cards_played_this_turn,
+                             self.passes)
+
+    def count_passes(self, cards, revealed):
+        # like Game.gameplay: a pass only counts if it is the whole turn
+        if cards:
+            self.passes = 0
+        elif not self.continuing:
+            self.passes += 1
+        self.continuing = bool(cards) and revealed
+
+    def record_move(self, move):
+        """
+        Call this with every move the player makes.
+        :param move: the Move or (cards, revealed) tuple
+        :return: None
+        """
+        cards, revealed = move
+        if revealed:
+            self.cards_played_this_turn = (self.cards_played_this_turn or []) + [(card.number, card.symbol)
+                                                                                for card in cards]
+        else:
+            self.cards_played_this_turn = None
+        self.count_passes(cards, revealed)
+
+    def receive_information(self, info: Information):
+        super().receive_information(info)
+        self.belief.observe(info)
+        if isinstance(info, CardsPlayedInfo):
+            self.count_passes(info.cards_played, any(isinstance(card, Card) for card in info.cards_played))
+
+
+class HintGUI(SituationTracker, GUI):
+    """
+    The GUI player with hints: while it's your move, the legal moves are evaluated in the background and the
+    best ones are shown in the log with their estimated chance of winning.
+    """
+    def __init__(self, service=None, shown=3):
+        """
+        :param service: a HintService, default is one with default settings
+        :param shown: number of moves to show
+        """
+        self.service = HintService() if service is None else service
+        self.shown = shown
+        super().__init__()
+
+    def show_hints(self, ranking, games):
+        self.output_queue.put_nowait(f"""Hint ({games} games per move): {', '.join(
+            f'{move} {win_probability*100:.0f}%' for move, win_probability in ranking[:self.shown])}""")
+
+    async def _choose_cards_to_play(self, opponents):
+        hints = None
+        if not self.game_over:
+            moves = self.legal_moves(opponents)
+            if len(moves) > 1:
+                hints = asyncio.create_task(self.service.evaluate(self.situation(opponents), moves, self.show_hints))
+        try:
+            move = await super()._choose_cards_to_play(opponents)
+        finally:
+            if hints is not None:
+                hints.cancel()
+        self.record_move(move)
+        return move
+
+    def receive_information(self, info: Information):
+        super().receive_information(info)
+        if isinstance(info, GameOverInfo):
+            self.service.close()
+
+
+class MonteCarloBot(SituationTracker, Player):
+    """
+    Evaluate every legal move with rollouts (see HintService) and play the one with the best chance of winning.
+
+    With pondering, the bot also thinks while its opponent is on turn: as soon as its own turn is over, it
+    evaluates its replies to the opponent's most likely moves in the background. The opponent's unrevealed
+    moves can be predicted from the numbers on the backs of their cards; only which of them will be played is
+    unknown. When the opponent has moved, the predictions that didn't come true are cancelled, and if the bot
+    then finds itself in the predicted situation, its answer is ready or at least under way. The cards the
+    opponent draws are unknown when pondering starts, so pondered estimates treat them as hidden.
+    Pondering only works in two-player games.
+    """
+    def __init__(self, base_name=None, service=None, ponder=False, predictions=3):
+        """
+        :param base_name: name of the player
+        :param service: a HintService for the rollouts, default is a quick one with default settings otherwise
+        :param ponder: True to think during the opponent's turn
+        :param predictions: number of opponent moves to prepare for, the longest ones first and passing last
+        """
+        self.service = HintService(rounds=2) if service is None else service
+        self.ponder = ponder
+        self.predictions = predictions
+        self.pondering = {}  # situation key -> task evaluating our moves in that situation
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        super().__init__(base_name)
+
+    def _default_name(self) -> str:
+        return "MonteCarlo"
+
+    def reset(self):
+        super().reset()
+        self.stop_pondering()
+        self.turn_over = False
+        self.opponents = []
+
+    @staticmethod
+    def situation_key(situation):
+        return (situation.position, tuple(situation.opponent_positions), tuple(situation.hand), situation.passes)
+
+    def stop_pondering(self, keep=None):
+        """
+        Cancel all pondering except for the situation with key `keep`.
+        """
+        for key, task in list(self.pondering.items()):
+            if key != keep:
+                task.cancel()
+                del self.pondering[key]
+
+    def predicted_situations(self, opponent):
+        """
+        The situations we may face after the opponent's next turn if they don't reveal any cards.
+        :param opponent: the opponent, who is about to move
+        :return: list of (HintSituation, Move list) tuples, most likely first
+        """
+        numbers = opponent.reveal_card_numbers()
+        plays = [(number, count) for number in sorted(set(numbers), reverse=True)
+                 for count in range(numbers.count(number), 0, -1)
+                 if opponent.position + number * count < self.rules.board_size]
+        plays.sort(key=lambda play: play[0] * play[1], reverse=True)
+        in_deck = int(self.belief.unseen.sum()) - len(numbers) - sum(self.belief.face_down.values())
+        predictions = []
+        for number, count in (plays + [(0, 0)])[:self.predictions]:
+            # the opponent draws one more card than played; we only know the number of the first one
+            drawn = min(count + self.rules.extra_draw, in_deck)
+            hand = list(numbers)
+            for _ in range(count):
+                hand.remove(number)
+            if drawn:
+                hand += [self.belief.top_of_deck] + [None] * (drawn - 1)
+            belief = copy.deepcopy(self.belief)
+            if count:
+                belief.face_down[number] += count
+            belief.cards_in_deck -= drawn
+            belief.top_of_deck = None
+            position = opponent.position + number * count
+            situation = HintSituation(self.rules, [(card.number, card.symbol) for card in self.hand],
+                                      self.position, [position], [hand], belief, None,
+                                      self.passes + 1 if count == 0 else 0)
+            predictions.append((situation, self.legal_moves([SimpleNamespace(position=position)])))
+        return predictions
+
+    def start_pondering(self, opponent):
+        for situation, moves in self.predicted_situations(opponent):
+            if len(moves) > 1:
+                self.pondering[self.situation_key(situation)] = \
+                    asyncio.create_task(self.service.evaluate(situation, moves))
+
+    async def _choose_cards_to_play(self, opponents):
+        moves = self.legal_moves(opponents)
+        situation = self.situation(opponents)
+        key = self.situation_key(situation)
+        pondered = self.pondering.pop(key, None)
+        self.stop_pondering()
+        if len(moves) == 1:
+            move = moves[0]
+        else:
+            if pondered is not None:
+                self.ponder_hits += 1
+                ranking = await pondered
+            else:
+                if self.ponder:
+                    self.ponder_misses += 1
+                ranking = await self.service.evaluate(situation, moves)
+            move = ranking[0][0]
+        self.record_move(move)
+        self.turn_over = not move.revealed
+        self.opponents = opponents
+        return move
+
+    def receive_information(self, info: Information):
+        super().receive_information(info)
+        if isinstance(info, TopOfDeckInfo):
+            # our turn is over and we have drawn our cards, so the opponent is about to move
+            if self.turn_over and self.ponder and len(self.opponents) == 1:
+                self.start_pondering(self.opponents[0])
+            self.turn_over = False
+        elif isinstance(info, CardsPlayedInfo):
+            if any(isinstance(card, Card) for card in info.cards_played):
+                self.stop_pondering()
+            else:
+                # keep only the prediction that came true, if any
+                self.stop_pondering(keep=self.situation_key(SimpleNamespace(
+                    position=self.position, opponent_positions=[info.opponent.position],
+                    hand=[(card.number, card.symbol) for card in self.hand], passes=self.passes)))
+        elif isinstance(info, GameOverInfo):
+            self.stop_pondering()
+
+    def close(self):
+        self.stop_pondering()
+        self.service.close()
+
+
+if __name__ == '__main__':
+    g = Game(Forrest(), HintGUI())
+    g.run()
+    g.print_result()
@@ -0,0 +1,161 @@
+# Play the primes game
+# This module runs leagues: many bot types, round-robin or Swiss pairings, Elo and Glicko ratings
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import multiprocessing
+import random
+
+from main import *
+from stats import GlickoRating, elo_update, wilson_interval
+
+
+def play_match(spec_a, spec_b, games, seed):
+    """
+    Play a two player match. Both players move first in half of the games.
+    This runs in a worker process, so the arguments must be picklable.
+    :param spec_a: PlayerSpec of the first player
+    :param spec_b: PlayerSpec of the second player
+    :param games: number of games
+    :param seed: random seed for the match
+    :return: points scored by player a
+    """
+    random.seed(seed)
+    a, b = spec_a.create(), spec_b.create()
+    t = Tournament(a, b)
+    t.run((games + 1) // 2)
+    t.players = [b, a]
+    t.run(games // 2)
+    return t.scores[id(a)]
+
+
+class LeagueEntry:
+    """
+    Accumulated results and ratings of one bot type.
+    """
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.label
+        self.glicko = GlickoRating()
+        self.elo = 1500.0
+        self.score = 0.0
+        self.games = 0
+        self.opponents = set()
+        self.had_bye = False
+
+
+class League:
+    def __init__(self, *players, games_per_match=100, workers=None, seed=None):
+        """
+        :param players: PlayerSpecs or Player subclasses of the bot types taking part, at least two
+        :param games_per_match: number of games each pairing plays per round
+        :param workers: number of worker processes, default is the number of CPUs
+        :param seed: random seed for reproducible leagues
+        """
+        assert len(players) >= 2, "A league needs at least two bot types."
+        self.entries = [LeagueEntry(as_spec(player)) for player in players]
+        assert len({entry.name for entry in self.entries}) == len(self.entries), \
+            "Bot types must have different names; give PlayerSpecs a name to tell them apart."
+        self.games_per_match = games_per_match
+        self.workers = workers
+        self.random = random.Random(seed)
+        self.rounds_played = 0
+        self.verbose = False
+
+    def set_verbose(self, verbose):
+        self.verbose = verbose
+
+    def round_robin_pairings(self):
+        return [(a, b) for i, a in enumerate(self.entries) for b in self.entries[i+1:]]
+
+    def swiss_pairings(self):
+        """
+        Pair entries with similar ratings, avoiding rematches where possible.
+        With an odd number of entries the lowest rated entry without a bye sits out.
+        :return: list of (entry, entry) tuples
+        """
+        ranked = sorted(self.entries, key=lambda entry: entry.glicko.rating, reverse=True)
+        if len(ranked) % 2:
+            candidates = [entry for entry in ranked if not entry.had_bye] or ranked
+            bye = candidates[-1]
+            bye.had_bye = True
+            ranked.remove(bye)
+        pairings = []
+        while ranked:
+            a = ranked.pop(0)
+            partner = next((b for b in ranked if b.name not in a.opponents), ranked[0])
+            ranked.remove(partner)
+            pairings.append((a, partner))
+        return pairings
+
+    def play_round(self, pairings, pool):
+        """
+        Play all matches of one round in the worker pool and update the ratings.
+        Elo is updated incrementally as matches finish, Glicko at the end of the round.
+        :param pairings: list of (entry, entry) tuples
+        :param pool: a multiprocessing pool
+        :return: None
+        """
+        jobs = [(a.spec, b.spec, self.games_per_match, self.random.getrandbits(64))
+                for a, b in pairings]
+        glicko_before = {entry.name: GlickoRating(entry.glicko.rating, entry.glicko.rd) for entry in self.entries}
+        results = {entry.name: [] for entry in self.entries}
+        for (a, b), score in zip(pairings, pool.starmap(play_match, jobs)):
+            games = self.games_per_match
+            elo_a, elo_b = a.elo, b.elo
+            a.elo = elo_update(elo_a, elo_b, score, games)
+            b.elo = elo_update(elo_b, elo_a, games - score, games)
+            a.score += score
+            b.score += games - score
+            a.games += games
+            b.games += games
+            a.opponents.add(b.name)
+            b.opponents.add(a.name)
+            results[a.name].append((glicko_before[b.name], score, games))
+            results[b.name].append((glicko_before[a.name], games - score, games))
+            if self.verbose:
+                print(f"{a.name} {score:.1f} - {games - score:.1f} {b.name}")
+        for entry in self.entries:
+            entry.glicko.update(results[entry.name])
+        self.rounds_played += 1
+
+    def run(self, rounds=1, schedule="round-robin"):
+        """
+        Play some rounds.
+        :param rounds: number of rounds
+        :param schedule: "round-robin" plays all pairings every round, "swiss" pairs entries with similar ratings
+        :return: None
+        """
+        assert schedule in ("round-robin", "swiss"), f"Unknown schedule {schedule}."
+        with multiprocessing.Pool(self.workers) as pool:
+            for _ in range(rounds):
+                pairings = self.round_robin_pairings() if schedule == "round-robin" else self.swiss_pairings()
+                self.play_round(pairings, pool)
+
+    def ranking(self):
+        """
+        :return: the entries sorted by Glicko rating, best first
+        """
+        return sorted(self.entries, key=lambda entry: entry.glicko.rating, reverse=True)
+
+    def print_results(self):
+        if not self.rounds_played:
+            print("No rounds have been played yet.")
+            return
+        print(f"League results after {self.rounds_played} rounds:")
+        width = max(len(entry.name) for entry in self.entries)
+        print(f"{'#':>3} {'Bot':<{width}} {'Glicko':>6} {'95% interval':>13} {'Elo':>6} {'Games':>7} {'Score':>6} "
+              f"{'95% interval':>13}")
+        for rank, entry in enumerate(self.ranking(), 1):
+            low, high = entry.glicko.interval()
+            score_low, score_high = wilson_interval(entry.score, entry.games)
+            print(f"{rank:>3} {entry.name:<{width}} {entry.glicko.rating:>6.0f} {low:>6.0f}-{high:<6.0f} "
+                  f"{entry.elo:>6.0f} {entry.games:>7} {entry.score/entry.games*100:>5.1f}% "
+                  f"{score_low*100:>5.1f}-{score_high*100:<5.1f}%")
+
+
+if __name__ == '__main__':
+    league = League(RandomBot, RandomNoPassBot, RandomTortoise, GreedyTortoise, Forrest)
+    while True:
+        league.run(1)
+        league.print_results()
@@ -2,14 +2,46 @@
 # Game design: Grant Sinclair
 # Code: Harald Bögeholz
 
+import itertools
+import json
+import math
+import os
+import pickle
+import time
+
 from game import *
+from metrics import MetricsServer
+from stats import sprt_bounds, sprt_llr, wilson_interval
+
+
+@dataclass
+class SequentialTestResult:
+    """
+    Outcome of `Tournament.run_sequential()`.
+    `winner` is the stronger player, None if neither is better by the margin or the test was inconclusive.
+    """
+    games: int
+    winner: Union['Player', None]
+    conclusive: bool
+    win_rate: float
+    interval: Tuple[float, float]
 
 
 class Tournament:
-    def __init__(self, *players):
+    def __init__(self, *players, rules=DEFAULT_RULES, analytics=None, spectator=None):
+        """
+        :param players: the players; strings are turned into text mode Human players
+        :param rules: the Rules to play by
+        :param analytics: optional AnalyticsCollector that accumulates the movements in all games
+        :param spectator: optional Spectator (see spectator.py) that watches all games
+        """
         assert len(players) >= 2, "The number of players must be at least 2."
         self.verbose = False
+        self.rules = rules
+        self.analytics = analytics
+        self.spectator = spectator
         self.players = [player if isinstance(player, Player) else Human(player) for player in players]
+        assign_names(self.players)
         self.scores = {id(player): 0 for player in self.players}
         self.games_played = 0
         self.number_of_turns = 0
@@ -17,6 +49,31 @@ class Tournament:
         self.number_used_all_cards = 0
         self.number_of_cards_left = 0
         self.winning_score = 0
+        # statistics of paired deals, see run_paired()
+        self.deals_played = 0
+        self.paired_games = 0
+        self.deal_sums = {id(player): 0 for player in self.players}
+        self.deal_squares = {id(player): 0 for player in self.players}
+        self.game_sums = {id(player): 0 for player in self.players}
+        self.game_squares = {id(player): 0 for player in self.players}
+        self.dealing = False
+        # checkpoints and live metrics, see enable_checkpoints() and enable_metrics()
+        self.checkpoint_path = None
+        self.checkpoint_every = 0
+        self.metrics_every = 0
+        self.metrics_stream = None
+        self.metrics_server = None
+        self.start_time = time.monotonic()
+        self.start_games = 0
+
+    @classmethod
+    def from_specs(cls, *specs, **kwargs):
+        """
+        :param specs: PlayerSpecs or Player subclasses, one per seat
+        :param kwargs: keyword arguments for the constructor
+        :return: a Tournament with freshly created players
+        """
+        return cls(*(as_spec(spec).create() for spec in specs), **kwargs)
 
     def set_verbose(self, verbose):
         self.verbose = verbose
@@ -25,7 +82,7 @@ class Tournament:
         """
         Score a game. Given the final position of a games, update self.scores and other stats
         :param finished_game: a finished game
-        :return: None
+        :return: a dict mapping the id of each player to the points scored in this game
         """
         self.games_played += 1
         best_position = finished_game.players[0].position
@@ -33,21 +90,267 @@ class Tournament:
         i = 1
         while i < len(finished_game.players) and finished_game.players[i].position == best_position:
             i += 1
+        points = {id(player): 0 for player in finished_game.players}
         for j in range(i):
             self.scores[id(finished_game.players[j])] += 1 / i
+            points[id(finished_game.players[j])] = 1 / i
+        return points
 
     def run(self, rounds):
         for i in range(rounds):
-            g = Game(*self.players)
-            g.set_verbose(self.verbose)
-            g.run()
-            if self.verbose:
-                g.print_result()
-            self.score(g)
-            self.number_of_turns += g.number_of_turns
-            self.number_of_setbacks += g.number_of_setbacks
-            self.number_of_cards_left += len(g.deck)
-            self.number_used_all_cards += len(g.deck) == 0
+            self.play_game(self.players)
+
+    def play_game(self, players, deck=None):
+        """
+        Play one game and update the statistics.
+        :param players: the players in playing order
+        :param deck: the deck to play with, default is a freshly shuffled deck
+        :return: a dict mapping the id of each player to the points scored in this game
+        """
+        g = Game(*players, deck=deck, rules=self.rules, analytics=self.analytics, spectator=self.spectator)
+        g.set_verbose(self.verbose)
+        g.run()
+        if self.verbose:
+            g.print_result()
+        points = self.score(g)
+        self.number_of_turns += g.number_of_turns
+        self.number_of_setbacks += g.number_of_setbacks
+        self.number_of_cards_left += len(g.deck)
+        self.number_used_all_cards += len(g.deck) == 0
+        # in the middle of a paired deal the statistics are incomplete, see run_paired()
+        if self.checkpoint_every and not self.dealing and self.games_played % self.checkpoint_every == 0:
+            self.save_checkpoint(self.checkpoint_path)
+        if self.metrics_every and self.games_played % self.metrics_every == 0:
+            self.publish_metrics()
+        return points
+
+    def run_paired(self, deals):
+        """
+        Variance reduction by common random numbers: every shuffled deck is played once for each seating order
+        of the players, so all players get the same luck of the draw. Bots that use `random` get the same random
+        numbers in each of these games, too. Results are aggregated per deal.
+        :param deals: number of decks to deal. Each deal plays factorial(number of players) games.
+            When resuming from a checkpoint, play the deals that are missing from `self.deals_played`.
+        :return: None
+        """
+        for _ in range(deals):
+            games_before = self.games_played
+            self.dealing = True
+            deck = new_deck(self.rules)
+            seed = random.getrandbits(64)
+            state = random.getstate()
+            deal_points = {id(player): 0 for player in self.players}
+            seatings = list(itertools.permutations(self.players))
+            for seating in seatings:
+                random.seed(seed)
+                points = self.play_game(seating, deck)
+                for key, p in points.items():
+                    deal_points[key] += p
+                    self.game_sums[key] += p
+                    self.game_squares[key] += p * p
+            for key, p in deal_points.items():
+                mean = p / len(seatings)
+                self.deal_sums[key] += mean
+                self.deal_squares[key] += mean * mean
+            random.setstate(state)
+            self.deals_played += 1
+            self.paired_games += len(seatings)
+            self.dealing = False
+            # checkpoints only at the end of a deal, if one was due during the deal
+            if self.checkpoint_every and \
+                    self.games_played // self.checkpoint_every > games_before // self.checkpoint_every:
+                self.save_checkpoint(self.checkpoint_path)
+
+    def paired_statistics(self, player):
+        """
+        Statistics of the paired deals played so far for one player.
+        :param player: one of the players in this tournament
+        :return: tuple (win rate, half width of its 95% confidence interval, variance reduction factor) where
+            the variance reduction factor says how many independently dealt games each paired game is worth
+        """
+        key = id(player)
+        n = self.deals_played
+        win_rate = self.deal_sums[key] / n
+        deal_variance = (self.deal_squares[key] - n * win_rate ** 2) / (n - 1) if n > 1 else 0.0
+        game_mean = self.game_sums[key] / self.paired_games
+        game_variance = self.game_squares[key] / self.paired_games - game_mean ** 2
+        games_per_deal = self.paired_games / n
+        half_width = 1.96 * math.sqrt(max(deal_variance, 0.0) / n)
+        reduction = game_variance / (games_per_deal * deal_variance) if deal_variance > 0 else math.inf
+        return win_rate, half_width, reduction
+
+    def run_sequential(self, max_games, margin=0.05, alpha=0.05, beta=0.05):
+        """
+        Play games until a sequential probability ratio test can tell whether one of two players
+        wins at least `margin` more often than 50%, or until `max_games` games have been played.
+        Two SPRTs run side by side, one for each player being stronger. Ties count as half a win.
+        The players take turns moving first, so the advantage of the first move isn't mistaken for strength.
+        :param max_games: the maximum number of games to play
+        :param margin: the smallest difference from a 50% win rate that we care about
+        :param alpha: probability of declaring a winner although the players are equally strong
+        :param beta: probability of missing a player that is stronger by `margin`
+        :return: a SequentialTestResult, counting only the games played in this call
+        """
+        assert len(self.players) == 2, "The sequential test compares exactly two players."
+        assert 0 < margin < 0.5, "The margin must be between 0 and 0.5."
+        first, second = self.players
+        lower, upper = sprt_bounds(alpha, beta)
+        start_score = self.scores[id(first)]
+        start_games = self.games_played
+        winner = None
+        conclusive = False
+        while self.games_played - start_games < max_games:
+            self.play_game([first, second] if (self.games_played - start_games) % 2 == 0 else [second, first])
+            n = self.games_played - start_games
+            score = self.scores[id(first)] - start_score
+            llr_first = sprt_llr(score, n, 0.5, 0.5 + margin)
+            llr_second = sprt_llr(score, n, 0.5, 0.5 - margin)
+            if llr_first >= upper:
+                winner, conclusive = first, True
+            elif llr_second >= upper:
+                winner, conclusive = second, True
+            elif llr_first <= lower and llr_second <= lower:
+                conclusive = True
+            if conclusive:
+                break
+        n = self.games_played - start_games
+        score = self.scores[id(first)] - start_score
+        result = SequentialTestResult(n, winner, conclusive, score / n if n else 0.5, wilson_interval(score, n))
+        if self.verbose:
+            print(result)
+        return result
+
+    def state_dict(self):
+        """
+        :return: the accumulated statistics and the state of the random number generator, with players
+            identified by their position in `self.players`
+        """
+        def by_index(d):
+            return [d[id(player)] for player in self.players]
+        return {"players": [type(player).__name__ for player in self.players],
+                "scores": by_index(self.scores),
+                "games_played": self.games_played,
+                "number_of_turns": self.number_of_turns,
+                "number_of_setbacks": self.number_of_setbacks,
+                "number_used_all_cards": self.number_used_all_cards,
+                "number_of_cards_left": self.number_of_cards_left,
+                "winning_score": self.winning_score,
+                "deals_played": self.deals_played,
+                "paired_games": self.paired_games,
+                "deal_sums": by_index(self.deal_sums),
+                "deal_squares": by_index(self.deal_squares),
+                "game_sums": by_index(self.game_sums),
+                "game_squares": by_index(self.game_squares),
+                "random_state": random.getstate()}
+
+    def statistics(self):
+        """
+        :return: the accumulated results of all games played, JSON serialisable, with players identified
+            by their position in `self.players`; see `add_statistics()`
+        """
+        return {"players": [type(player).__name__ for player in self.players],
+                "scores": [self.scores[id(player)] for player in self.players],
+                **{name: getattr(self, name) for name in ("games_played", "number_of_turns", "number_of_setbacks",
+                                                          "number_used_all_cards", "number_of_cards_left",
+                                                          "winning_score")}}
+
+    def add_statistics(self, statistics):
+        """
+        Add the results of games played elsewhere, e.g. by another process with the same players.
+        :param statistics: a dict returned by `statistics()`
+        :return: None
+        """
+        assert statistics["players"] == [type(player).__name__ for player in self.players], \
+            f"The statistics are for players {', '.join(statistics['players'])}."
+        for player, score in zip(self.players, statistics["scores"]):
+            self.scores[id(player)] += score
+        for name in ("games_played", "number_of_turns", "number_of_setbacks", "number_used_all_cards",
+                     "number_of_cards_left", "winning_score"):
+            setattr(self, name, getattr(self, name) + statistics[name])
+
+    def load_state_dict(self, state):
+        """
+        Restore what `state_dict()` returned. The players must be of the same classes, in the same order.
+        :param state: a dict returned by `state_dict()`
+        :return: None
+        """
+        assert state["players"] == [type(player).__name__ for player in self.players], \
+            f"The checkpoint is for players {', '.join(state['players'])}."
+        for name in ("games_played", "number_of_turns", "number_of_setbacks", "number_used_all_cards",
+                     "number_of_cards_left", "winning_score", "deals_played", "paired_games"):
+            setattr(self, name, state[name])
+        for name in ("scores", "deal_sums", "deal_squares", "game_sums", "game_squares"):
+            setattr(self, name, {id(player): value for player, value in zip(self.players, state[name])})
+        random.setstate(state["random_state"])
+        self.start_time = time.monotonic()
+        self.start_games = self.games_played
+
+    def save_checkpoint(self, path):
+        """
+        Write the state to `path` atomically: a crash leaves either the old or the new checkpoint.
+        :param path: file name
+        :return: None
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump(self.state_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    def load_checkpoint(self, path):
+        with open(path, "rb") as f:
+            self.load_state_dict(pickle.load(f))
+
+    def enable_checkpoints(self, path, every=1000, resume=True):
+        """
+        Save a checkpoint every `every` games.
+        :param path: file name of the checkpoint
+        :param every: number of games between checkpoints
+        :param resume: if the checkpoint exists, continue from it
+        :return: None
+        """
+        self.checkpoint_path = path
+        self.checkpoint_every = every
+        if resume and os.path.exists(path):
+            self.load_checkpoint(path)
+
+    def metrics(self):
+        """
+        :return: a JSON serialisable dict with the throughput since the start (or resume) and the results so far
+        """
+        elapsed = time.monotonic() - self.start_time
+        games = max(self.games_played, 1)
+        return {"time": time.time(),
+                "games_played": self.games_played,
+                "games_per_second": (self.games_played - self.start_games) / elapsed if elapsed > 0 else 0.0,
+                "win_rates": {player.name: self.scores[id(player)] / games for player in self.players},
+                "turns_per_game": self.number_of_turns / games,
+                "setbacks_per_game": self.number_of_setbacks / games,
+                "winning_score": self.winning_score / games,
+                "cards_left": self.number_of_cards_left / games,
+                "used_all_cards": self.number_used_all_cards / games}
+
+    def enable_metrics(self, every=1000, stream=None, port=None):
+        """
+        Publish `metrics()` every `every` games.
+        :param every: number of games between updates
+        :param stream: optional file name; each update is appended as one line of JSON
+        :param port: optional TCP port for a local HTTP endpoint serving the latest update, 0 picks a free port
+        :return: None
+        """
+        self.metrics_every = every
+        self.metrics_stream = stream
+        if port is not None and self.metrics_server is None:
+            self.metrics_server = MetricsServer(port)
+
+    def publish_metrics(self):
+        metrics = self.metrics()
+        if self.metrics_stream:
+            with open(self.metrics_stream, "a") as f:
+                f.write(json.dumps(metrics) + "\n")
+        if self.metrics_server:
+            self.metrics_server.publish(metrics)
 
     def print_results(self):
         if self.games_played:
@@ -61,6 +364,12 @@ class Tournament:
                 self.winning_score/self.games_played:.1f}, {
                 self.number_of_cards_left/self.games_played:.1f} cards in deck""")
             print(f"{self.number_used_all_cards/self.games_played*100:.1f}% of games used all cards.")
+            if self.deals_played:
+                print(f"Paired results after {self.deals_played} deals ({self.paired_games} games):")
+                for player in self.players:
+                    win_rate, half_width, reduction = self.paired_statistics(player)
+                    print(f"""{player.name}: {win_rate*100:.1f}% ± {half_width*100:.1f}%, variance reduced {
+                        reduction:.1f}-fold compared to unpaired games""")
         else:
             print("No games have been played yet.")
 
@@ -72,6 +381,8 @@ if __name__ == '__main__':
 
     t = Tournament(RandomNoPassBot(), RandomNoPassBot())
     # t.set_verbose(True)
+    t.enable_checkpoints("tournament.checkpoint")
+    t.enable_metrics(stream="tournament-metrics.jsonl")
     while True:
         t.run(1000)
         t.print_results()
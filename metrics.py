@@ -0,0 +1,51 @@
+# Play the primes game
+# This module publishes the live statistics of long runs over HTTP
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MetricsServer:
+    """
+    A tiny HTTP server in a daemon thread. Every GET request is answered with the latest metrics as JSON.
+    Publishing just replaces a reference, so it never waits for a client.
+    """
+    def __init__(self, port, host="127.0.0.1"):
+        """
+        :param port: TCP port, 0 picks a free one (see `self.port`)
+        :param host: interface to listen on, default is local connections only
+        """
+        self.latest = {}
+        metrics_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(metrics_server.latest).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def publish(self, metrics):
+        """
+        :param metrics: a JSON serialisable dict
+        :return: None
+        """
+        self.latest = metrics
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -5,6 +5,9 @@
 
 from __future__ import annotations
 
+import functools
+import importlib
+import operator
 import random
 from abc import ABC, abstractmethod
 import tkinter as tk
@@ -18,7 +21,8 @@ def clear_screen():
     if platform.system().lower() == "windows":
         os.system("cls")
     else:
-        os.system("clear")
+        # ANSI escape sequence instead of forking `clear` on every move
+        print("\033[H\033[2J", end="", flush=True)
 
 import subprocess
 
@@ -32,6 +36,7 @@ except:
 
 
 from carddict import *
+from rules import *
 
 class Card:
     def __init__(self, number, symbol):
@@ -92,7 +97,7 @@ class GUIState:
     player_name: str
     player_position: int
     player_hand: List[Card]
-    legal_moves: List[Tuple[List[Card], bool]]
+    legal_moves: 'LegalMoves'
     top_of_deck: int
     game_over: bool
 
@@ -119,7 +124,9 @@ class CardGameGUI:
         self.hand = random.sample(self.card_fronts, 5)
         self.opponent_hand = random.sample(self.card_backs, 5)
         self.selected_cards = []
-        self.legal_moves = []
+        self.legal_moves = LegalMoves()
+        self.play_move = None
+        self.reveal_move = None
         self.player_position = 0
         self.game_over = 0
 
@@ -299,11 +306,13 @@ class CardGameGUI:
 
     def update_selected_cards(self):
         self.selected_cards = [card for card, var in zip(self.hand, self.card_vars) if var.get()]
-        if (self.selected_cards, False) in self.legal_moves:
+        self.play_move = self.legal_moves.find(self.selected_cards, False)
+        self.reveal_move = self.legal_moves.find(self.selected_cards, True)
+        if self.play_move is not None:
             self.play_button.config(state=tk.NORMAL)
         else:
             self.play_button.config(state=tk.DISABLED)
-        if (self.selected_cards, True) in self.legal_moves:
+        if self.reveal_move is not None:
             self.reveal_button.config(state=tk.NORMAL)
         else:
             self.reveal_button.config(state=tk.DISABLED)
@@ -315,10 +324,10 @@ class CardGameGUI:
 
 
     def play_cards(self):
-        self.input_queue.put_nowait((self.selected_cards, False))
+        self.input_queue.put_nowait(self.play_move)
 
     def reveal_cards(self):
-        self.input_queue.put_nowait((self.selected_cards, True))
+        self.input_queue.put_nowait(self.reveal_move)
 
     def update_GUI_state(self, state):
         self.game_over = state.game_over
@@ -393,19 +402,308 @@ class GameOverInfo(Information):
     This empty class just signals that the game is over.
     """
 
-class Player(ABC):
+
+def move_attributes(revealed, delta, targets, start, opponent_starts):
+    """
+    :return: dict of the attributes of a Move that don't depend on the Card objects
+    """
+    return {"delta": delta,
+            "targets": targets,
+            "distance": delta * len(targets) if revealed else delta,
+            "start": start,
+            "opponent_starts": opponent_starts}
+
+
+def compute_grouped_moves(hand_key, position, opponent_squares, rules=DEFAULT_RULES):
+    """
+    The expensive part of `compute_legal_moves()`, which only depends on how many opponents stand on each square,
+    not on their order: opponents on the same square can be set back by the same cards, and a combination of
+    symbols matches only one square, because prime factorisations are unique.
+    :param hand_key: tuple of (number, symbol) tuples describing the player's hand in sorted order
+    :param position: the player's position
+    :param opponent_squares: sorted tuple of (square, number of opponents on that square) tuples
+    :param rules: the Rules of the game
+    :return: a tuple where each element is a tuple (tuple of indices into the hand, revealed, delta, square) where
+        square is the square of the opponents that are set back, None if the cards are not revealed.
+        Passing is always first.
+    """
+    def more(number, j):
+        """
+        recursive local function for generating all combinations of adding more of the same number
+        :param number: The number to add
+        :param j: index to start looking
+        :return: list of lists of all combinations (indices into the hand)
+        """
+        if j >= len(hand_key) or hand_key[j][0] != number:
+            return [[]]
+        else:
+            jss = more(number, j+1)
+            return [[j]+js for js in jss] + jss
+
+    legal = [([], False, None)] # passing is always a legal move
+    for i in range(len(hand_key)):
+        number = hand_key[i][0]
+        legal += [([i] + js, False, None) for js in more(number, i+1)]
+
+    def find_setbacks(symbols, i, prev_symbol):
+        """
+        Local recursive function to find combinations of cards with `symbols`
+        :param symbols: The combination of symbols to find
+        :param i: minimum index to look at -- only if same as previous symbol
+        :param prev_symbol: previous symbol covered
+        :return: a list of lists of indices into the hand
+        """
+        if not symbols:
+            return [[]]
+        symbol = symbols[0]
+        if symbol != prev_symbol:
+            i = 0
+        result = []
+        for j in range(i, len(hand_key)):
+            if hand_key[j][1] == symbol:
+                result += [[j] + xs for xs in find_setbacks(symbols[1:], j+1, symbol)]
+        return result
+
+    symbols_in_hand = {symbol for _, symbol in hand_key}
+    for square, _ in opponent_squares:
+        symbols = rules.factors[square]
+        # with many opponents, most squares need a symbol we don't have
+        if not symbols_in_hand.issuperset(symbols):
+            continue
+        setbacks = find_setbacks(symbols, 0, None)
+
+        # RULE: can't set back an opponent off the board.
+        # So eliminate all setbacks that would do that
+        for setback in setbacks:
+            if setback: # only consider nonempty sets of cards
+                delta = sum(hand_key[i][0] for i in setback)
+                if 0 <= square - delta:
+                    legal.append((setback, True, square))
+
+    # RULE: Can't move player off the board.
+    opponents_on = dict(opponent_squares)
+    moves = []
+    for js, revealed, square in legal:
+        delta = sum(hand_key[j][0] for j in js)
+        # RULE: For each opponent that is set back, move forward
+        total_delta = delta * opponents_on[square] if revealed else delta
+        if position + total_delta <= rules.board_size:
+            # the hand is sorted, so sorted indices give the cards in sorted order
+            moves.append((tuple(sorted(js)), revealed, delta, square))
+    return tuple(moves)
+
+
+def compute_legal_moves(hand_key, position, opponent_positions, rules=DEFAULT_RULES):
+    """
+    legal moves are any number of cards with the same number
+    or a combination of symbols that setbacks an opponent
+    :param hand_key: tuple of (number, symbol) tuples describing the player's hand in sorted order
+    :param position: the player's position
+    :param opponent_positions: tuple of the opponents' positions
+    :param rules: the Rules of the game
+    :return: a tuple where each element is a tuple (tuple of indices into the hand, revealed, attributes) where
+        revealed is a bool indicating whether to play the cards revealed and attributes is a dict from
+        `move_attributes()` for the Move. Passing is always first.
+    """
+    # group the opponents by square; the moves come from a cache that doesn't care about the order of the opponents
+    targets = {}
+    for k, opponent_position in enumerate(opponent_positions):
+        targets[opponent_position] = targets.get(opponent_position, ()) + (k,)
+    opponent_squares = tuple(sorted([(square, len(ks)) for square, ks in targets.items()]))
+    # with a single opponent there is only one order, so the legal move cache already has everything
+    grouped_moves = compute_grouped_moves if len(opponent_positions) == 1 else _cached_grouped_moves
+    targets[None] = ()
+    return tuple([(js, revealed, move_attributes(revealed, delta, targets[square], position, opponent_positions))
+                  for js, revealed, delta, square in grouped_moves(hand_key, position, opponent_squares, rules)])
+
+
+class Move(tuple):
+    """
+    A legal move. For compatibility it is a tuple (cards, revealed), so `cards, revealed = move` still works,
+    but it also knows everything the engine and the bots need:
+    delta: sum of the card numbers; opponents that are set back move back by this much
+    targets: indices of the opponents (in the order given to `legal_moves()`) that are set back
+    distance: how far the player moves forward
+    position, opponent_positions: the positions after the move
+    key: canonical (tuple of (number, symbol), revealed), independent of the Card objects
+    Moves are immutable and hashable.
+    """
+    def __new__(cls, cards, revealed, delta, targets=(), start=0, opponent_starts=()):
+        """
+        :param cards: tuple of Card objects in hand order
+        :param revealed: whether the cards are played symbol-side up
+        :param delta: sum of the card numbers
+        :param targets: tuple of indices of the opponents that are set back
+        :param start: the player's position before the move
+        :param opponent_starts: tuple of the opponents' positions before the move
+        """
+        return cls._with_attributes(cards, revealed, move_attributes(revealed, delta, targets, start, opponent_starts))
+
+    @classmethod
+    def _with_attributes(cls, cards, revealed, attributes):
+        """
+        Fast construction from a dict made by `move_attributes()`. The dict becomes the `__dict__` of the move,
+        so moves made from the same legal move cache entry share it. That is safe because everything in it,
+        including the cached properties, only depends on the situation, not on the Card objects.
+        """
+        move = tuple.__new__(cls, (cards, revealed))
+        object.__setattr__(move, "__dict__", attributes)
+        return move
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Moves are immutable.")
+
+    def __reduce__(self):
+        return Move, (self.cards, self.revealed, self.delta, self.targets, self.start, self.opponent_starts)
+
+    cards = property(operator.itemgetter(0))
+    revealed = property(operator.itemgetter(1))
+
+    @property
+    def position(self):
+        return self.start + self.distance
+
+    @functools.cached_property
+    def opponent_positions(self):
+        return tuple(p - self.delta if k in self.targets else p for k, p in enumerate(self.opponent_starts))
+
+    @functools.cached_property
+    def key(self):
+        return tuple((card.number, card.symbol) for card in self.cards), self.revealed
+
+    def __str__(self):
+        if not self.cards:
+            return "pass"
+        return f"{'play revealed' if self.revealed else 'play'} {' '.join(str(card) for card in self.cards)}"
+
+    def __repr__(self):
+        return f"<Move {self}>"
+
+
+class LegalMoves(list):
+    """
+    The list of legal moves in a situation, with passing first. `find()` looks up a move by the selected cards
+    in constant time; the index is built on first use.
+    """
+    def __init__(self, moves=()):
+        super().__init__(moves)
+        self.by_selection = None
+
+    def find(self, cards, revealed):
+        """
+        :param cards: the selected Card objects in any order
+        :param revealed: whether to play them revealed
+        :return: the Move or None if the selection is not a legal move
+        """
+        if self.by_selection is None:
+            self.by_selection = {(frozenset(map(id, move.cards)), move.revealed): move for move in self}
+        return self.by_selection.get((frozenset(map(id, cards)), revealed))
+
+
+# Legal moves only depend on the (number, symbol) pairs in the hand and on the positions, so they can be cached
+# process-wide. There are two levels: the legal moves for the opponents in a given order, and below that the moves
+# grouped by square, which games with many players can share between all orders of the same opponent positions.
+# Bots rarely see the same situation twice (a few percent of lookups hit), and keeping the entries alive costs more
+# than the hits save, so the caches are off by default. Human players switch them on: a user interface asks for
+# the legal moves of the same situation again and again.
+DEFAULT_LEGAL_MOVE_CACHE_SIZE = 0
+INTERACTIVE_LEGAL_MOVE_CACHE_SIZE = 65536
+_cached_legal_moves = functools.lru_cache(maxsize=DEFAULT_LEGAL_MOVE_CACHE_SIZE)(compute_legal_moves)
+_cached_grouped_moves = functools.lru_cache(maxsize=DEFAULT_LEGAL_MOVE_CACHE_SIZE)(compute_grouped_moves)
+
+
+def set_legal_move_cache_size(maxsize):
+    """
+    Replace the legal move caches by empty caches of a different size.
+    :param maxsize: maximum number of cached situations, 0 disables caching, None means unbounded
+    :return: None
+    """
+    global _cached_legal_moves, _cached_grouped_moves
+    _cached_legal_moves = functools.lru_cache(maxsize=maxsize)(compute_legal_moves)
+    _cached_grouped_moves = functools.lru_cache(maxsize=maxsize)(compute_grouped_moves)
+
+
+def enable_legal_move_cache(maxsize=INTERACTIVE_LEGAL_MOVE_CACHE_SIZE):
+    """
+    Switch the legal move caches on, unless they are on already.
+    :param maxsize: maximum number of cached situations
+    :return: None
+    """
+    if _cached_legal_moves.cache_info().maxsize == 0:
+        set_legal_move_cache_size(maxsize)
+
+
+@dataclass
+class LegalMoveCacheInfo:
+    hits: int
+    misses: int
+    size: int
+    maxsize: Union[int, None]
+    grouped: Union['LegalMoveCacheInfo', None] = None  # the cache of moves grouped by square
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def describe(self):
+        return f"""{self.size}/{self.maxsize} entries, {self.hits} hits, {self.misses} misses ({
+            self.hit_rate*100:.1f}% hit rate)"""
+
+    def __str__(self):
+        result = f"legal move cache: {self.describe()}"
+        if self.grouped is not None:
+            result += f"; grouped by square: {self.grouped.describe()}"
+        return result
+
+
+def legal_move_cache_info():
+    """
+    :return: a LegalMoveCacheInfo with statistics about the legal move cache, and in its `grouped` attribute
+        those about the cache of moves grouped by square
+    """
+    info = _cached_legal_moves.cache_info()
+    grouped = _cached_grouped_moves.cache_info()
+    return LegalMoveCacheInfo(info.hits, info.misses, info.currsize, info.maxsize,
+                              LegalMoveCacheInfo(grouped.hits, grouped.misses, grouped.currsize, grouped.maxsize))
+
+
+def clear_legal_move_cache():
+    _cached_legal_moves.cache_clear()
+    _cached_grouped_moves.cache_clear()
+
+
+def assign_names(players):
+    """
+    Give the players unique names within one game or tournament by numbering players with the same base name:
+    Forrest, Forrest2, Forrest3, ... Players whose names are already unique keep them, so a Tournament's names
+    survive the Games it creates.
+    :param players: list of Player objects
+    :return: None
+    """
     assigned_names = set()
+    for player in players:
+        i = 1
+        while player.name in assigned_names:
+            i += 1
+            player.name = f"{player.base_name}{i}"
+        assigned_names.add(player.name)
+
+
+class Player(ABC):
+    registry = {}  # class name -> Player subclass, filled automatically, see PlayerSpec
+    rules = DEFAULT_RULES  # the Game sets this for each player
     def __init__(self, base_name=None):
         if base_name is None:
             base_name = self._default_name()
-        self.name = base_name
-        i = 1
-        while self.name in Player.assigned_names:
-            i += 1
-            self.name = f"{base_name}{i}"
-        Player.assigned_names.add(self.name)
+        self.base_name = base_name
+        self.name = base_name  # made unique by the Game or Tournament, see assign_names()
         self.reset()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Player.registry[cls.__name__] = cls
+
     @abstractmethod
     def _default_name(self) -> str:
         """
@@ -474,23 +772,14 @@ class Player(ABC):
 
     def move(self, delta):
         self.position += delta
-        assert 0 <= self.position <= 100, f"Can't move {self.name} off-board to {self.position}"
+        assert 0 <= self.position <= self.rules.board_size, f"Can't move {self.name} off-board to {self.position}"
 
     def needed_to_setback(self):
         """
         :return: list of symbols required to set back this player.
             This is the prime factorisation of the current position.
         """
-        primes = []
-        pos = self.position
-        i = 2
-        while pos > 1:
-            if pos % i == 0:
-                primes.append(i)
-                pos //= i
-            else:
-                i += 1
-        return primes
+        return list(self.rules.factors[self.position])
 
     def position_with_hints(self):
         """
@@ -508,99 +797,106 @@ class Player(ABC):
         legal moves are any number of cards with the same number
         or a combination of symbols that setbacks an opponent
         :param opponents: other players
-        :return: a list where each element is a tuple of (list of Card objects, revealed) where
+        :return: LegalMoves, a list of Move objects, which are tuples of (tuple of Card objects, revealed) where
             revealed is a bool indicating whether to play the cards revealed. Passing is always first in the list.
         """
-        def more(number, j):
-            """
-            recursive local function for generating all combinations of adding more of the same number
-            :param number: The number to add
-            :param j: index to start looking
-            :return: list of lists of all combinations (indices into self.hand)
-            """
-            if j >= len(self.hand) or self.hand[j].number != number:
-                return [[]]
-            else:
-                jss = more(number, j+1)
-                return [[j]+js for js in jss] + jss
-
-        legal = [([], False)] # passing is always a legal move
-        for i in range(len(self.hand)):
-            number = self.hand[i].number
-            legal += [([i] + js, False) for js in more(number, i+1)]
-
-        def find_setbacks(symbols, i, prev_symbol):
-            """
-            Local recursive function to find combinations of cards with `symbols`
-            :param symbols: The combination of symbols to find
-            :param i: minimum index to look at -- only if same as previous symbol
-            :param prev_symbol: previous symbol covered
-            :return: a list of lists of indices into the current hand
-            """
-            if not symbols:
-                return [[]]
-            symbol = symbols[0]
-            if symbol != prev_symbol:
-                i = 0
-            result = []
-            for j in range(i, len(self.hand)):
-                if self.hand[j].symbol == symbol:
-                    result += [[j] + xs for xs in find_setbacks(symbols[1:], j+1, symbol)]
-            return result
-
-        for opponent in opponents:
-            symbols = opponent.needed_to_setback()
-            setbacks = find_setbacks(symbols, 0, None)
-
-            # RULE: can't set back an opponent off the board.
-            # So eliminate all setbacks that would do that
-            for setback in setbacks:
-                if setback: # only consider nonempty sets of cards
-                    delta = sum (self.hand[i].number for i in setback)
-                    if 0 <= opponent.position - delta:
-                        if (setback, True) not in legal:
-                            legal.append((setback, True))
-
-        # RULE: Can't move player off the board.
-        for i in range(len(legal)-1, -1, -1):
-            js, revealed = legal[i]
-            delta = sum(self.hand[j].number for j in js)
-            symbols = [self.hand[j].symbol for j in js]
-            if revealed:
-                total_delta = 0
-                for opponent in opponents:
-                    if opponent.symbols_match(symbols):
-                        total_delta += delta # RULE: For each opponent that is set back, move forward
-            else:
-                total_delta = delta
-            if self.position + total_delta > 100:
-                legal.pop(i)
-
-        # replace indices by actual card objects
-        legal_cards = [(sorted([self.hand[j] for j in js], key=lambda card:(card.number, card.symbol, id(card))),
-                        revealed) for js, revealed in legal]
-        return legal_cards
+        hand = self.hand
+        hand_key = tuple((card.number, card.symbol) for card in hand)
+        position = self.position
+        opponent_positions = tuple(opponent.position for opponent in opponents)
+        card = hand.__getitem__
+        with_attributes = Move._with_attributes
+        return LegalMoves([with_attributes(tuple(map(card, js)), revealed, attributes)
+                           for js, revealed, attributes
+                           in _cached_legal_moves(hand_key, position, opponent_positions, self.rules)])
 
     def symbols_match(self, symbols):
         """
         :param symbols: a list of prime factors
         :return: True if `symbols` are exactly the prime factors of the current position
         """
-        p = self.position
-        for n in symbols:
-            if p % n:
-                return False
-            p //= n
-        return p == 1
+        return symbols_match_position(symbols, self.position)
 
     async def play_cards(self, opponents):
-        playing_cards, revealed = await self._choose_cards_to_play(opponents)
-        for card in playing_cards:
+        """
+        Let the strategy choose a move and remove its cards from the hand.
+        :param opponents: A list of Player objects representing the opponents.
+        :return: the Move. Strategies may also return (cards, revealed) tuples; they are looked up in `legal_moves()`.
+        """
+        move = await self._choose_cards_to_play(opponents)
+        if not isinstance(move, Move) or move.start != self.position or \
+                move.opponent_starts != tuple(opponent.position for opponent in opponents):
+            cards, revealed = move
+            move = self.legal_moves(opponents).find(cards, revealed)
+            assert move is not None, f"{self.name} tried to play an illegal move: {cards}, revealed={revealed}"
+        for card in move.cards:
             self.hand.remove(card)
-        return playing_cards, revealed
+        return move
+
+
+@dataclass(frozen=True)
+class PlayerSpec:
+    """
+    A picklable recipe for a player: which Player subclass to instantiate with which parameters.
+    Specs are cheap to send to worker processes, which create their own players with `create()`.
+    """
+    class_name: str
+    params: Tuple[Tuple[str, object], ...] = ()
+    module: Union[str, None] = None
+    name: Union[str, None] = None
+
+    @classmethod
+    def of(cls, player_class, name=None, **params):
+        """
+        :param player_class: a Player subclass or its name, optionally with the module: "belief.Wary"
+        :param name: base name for the player, default is the class's default
+        :param params: keyword arguments for the constructor
+        :return: a PlayerSpec
+        """
+        if isinstance(player_class, str):
+            module, _, class_name = player_class.rpartition(".")
+            return cls(class_name, tuple(sorted(params.items())), module or None, name)
+        module = player_class.__module__ if player_class.__module__ != "__main__" else None
+        return cls(player_class.__name__, tuple(sorted(params.items())), module, name)
+
+    def create(self):
+        """
+        :return: a new Player object
+        """
+        if self.module:
+            importlib.import_module(self.module)
+        assert self.class_name in Player.registry, f"Unknown player class {self.class_name}."
+        player = Player.registry[self.class_name](**dict(self.params))
+        if self.name is not None:
+            player.base_name = player.name = self.name
+        return player
+
+    @property
+    def label(self):
+        """
+        :return: a readable name for reports
+        """
+        if self.name is not None:
+            return self.name
+        if not self.params:
+            return self.class_name
+        return f"{self.class_name}({', '.join(f'{key}={value!r}' for key, value in self.params)})"
+
+
+def as_spec(player):
+    """
+    :param player: a PlayerSpec, a Player subclass or the name of one
+    :return: a PlayerSpec
+    """
+    if isinstance(player, PlayerSpec):
+        return player
+    return PlayerSpec.of(player)
 
 
 class Human(Player):
+    def __init__(self, base_name=None):
+        enable_legal_move_cache()
+        super().__init__(base_name)
 
     def _default_name(self):
         return "Human"
@@ -648,6 +944,7 @@ class Human(Player):
 
 class GUI(Player):
     def __init__(self):
+        enable_legal_move_cache()
         super().__init__()
         self.input_queue = None
         self.output_queue = None
@@ -669,7 +966,7 @@ class GUI(Player):
                              "You",
                              self.position,
                              self.hand,
-                             [] if self.game_over else self.legal_moves(opponents),
+                             LegalMoves() if self.game_over else self.legal_moves(opponents),
                              self.top_of_deck,
                              self.game_over
                              )
@@ -679,7 +976,8 @@ class GUI(Player):
         #     self.output_queue.put_nowait(f"""- {'pass' if not cards else 'play revealed' if revealed else 'play'} {
         #     ' '.join(str(card) for card in cards)}""")
 
-        cards_to_play, revealed = await self.input_queue.get()
+        move = await self.input_queue.get()
+        cards_to_play, revealed = move
         if revealed:
             self.output_queue.put_nowait(f"You reveal {' '.join(str(card) for card in cards_to_play)}")
         else:
@@ -688,7 +986,7 @@ class GUI(Player):
             else:
                 self.output_queue.put_nowait("You pass")
 
-        return cards_to_play, revealed
+        return move
 
 
     def receive_information(self, info: Information):
@@ -767,7 +1065,7 @@ class GreedyTortoise(Player):
         if len(l) == 1 or all(self.position > opponent.position for opponent in opponents):
             return l[0]
 
-        return max(l[1:], key = lambda m: (m[1], sum(card.number for card in m[0])))
+        return max(l[1:], key = lambda m: (m.revealed, m.delta))
 
     def receive_information(self, info: Information):
         pass
@@ -783,9 +1081,84 @@ class Forrest(Player):
     async def _choose_cards_to_play(self, opponents):
         l = self.legal_moves(opponents)
 
-        return max(l, key = lambda m: (m[1], sum(card.number for card in m[0])))
+        return max(l, key = lambda m: (m.revealed, m.delta))
 
     def receive_information(self, info: Information):
         pass
 
 
+
+class HeuristicBot(Player):
+    """
+    Score every legal move as a weighted sum of features and play the best one. The features are:
+    revealed: 1 if the cards are played revealed, i.e. the move sets back at least one opponent
+    distance: squares gained (in tens)
+    setback: squares the opponents are set back in total (in tens)
+    cards_kept: cards left in the hand after the move
+    prime: 1 if the move ends the turn on a prime square
+    composite: 1 if the move ends the turn on a composite square
+    deck: squares gained (in tens) times the fraction of the deck already drawn, i.e. urgency near the end
+    pass_ahead: 1 if the move is a pass while we're ahead of all opponents
+    Passing scores 0 on everything except cards_kept and pass_ahead. The default weights play like Forrest in
+    two-player games: the weight of revealed outweighs any distance on boards of up to 1000 squares, so
+    revealing always wins, even if it gains nothing. The weights can be tuned with tuning.py.
+    """
+    FEATURES = ("revealed", "distance", "setback", "cards_kept", "prime", "composite", "deck", "pass_ahead")
+    DEFAULT_WEIGHTS = {"revealed": 100.0, "distance": 1.0, "setback": 10.0, "cards_kept": 0.0, "prime": 0.0,
+                       "composite": 0.0, "deck": 0.0, "pass_ahead": 0.0}
+
+    def __init__(self, base_name=None, **weights):
+        """
+        :param base_name: name of the player
+        :param weights: weight for each feature in FEATURES, missing ones are taken from DEFAULT_WEIGHTS
+        """
+        for feature in weights:
+            assert feature in self.FEATURES, f"Unknown feature {feature}."
+        self.weights = {**self.DEFAULT_WEIGHTS, **weights}
+        super().__init__(base_name)
+
+    def _default_name(self) -> str:
+        return "Heuristic"
+
+    def reset(self):
+        super().reset()
+        self.cards_drawn = 0
+        self.dealt_to_opponents = False
+
+    def receive_card(self, card):
+        super().receive_card(card)
+        self.cards_drawn += 1
+
+    def features(self, move, opponents):
+        """
+        :param move: a Move from `legal_moves()`
+        :param opponents: other players
+        :return: dict mapping each feature to its value
+        """
+        gain = move.distance
+        setback = gain if move.revealed else 0
+        factors = len(self.rules.factors[move.position])
+        ends_turn = not move.revealed and gain > 0
+        return {"revealed": float(move.revealed),
+                "distance": gain / 10,
+                "setback": setback / 10,
+                "cards_kept": len(self.hand) - len(move.cards),
+                "prime": float(ends_turn and factors == 1),
+                "composite": float(ends_turn and factors > 1),
+                "deck": gain / 10 * min(1.0, self.cards_drawn / len(self.rules.deck)),
+                "pass_ahead": float(not move.cards and all(self.position > opponent.position for opponent in opponents))}
+
+    def score(self, move, opponents):
+        features = self.features(move, opponents)
+        return sum(self.weights[feature] * features[feature] for feature in self.FEATURES)
+
+    async def _choose_cards_to_play(self, opponents):
+        if not self.dealt_to_opponents:
+            # opponents' starting hands were dealt before anyone told us about draws
+            self.cards_drawn += self.rules.starting_hand * len(opponents)
+            self.dealt_to_opponents = True
+        return max(self.legal_moves(opponents), key=lambda move: self.score(move, opponents))
+
+    def receive_information(self, info: Information):
+        if isinstance(info, CardDrawInfo):
+            self.cards_drawn += 1
@@ -0,0 +1,94 @@
+# Play the primes game
+# This module describes the rules that can be varied: board, deck, draw rule and starting hand
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+from carddict import cardDict
+
+
+def prime_factors(position):
+    """
+    :param position: a square on the board
+    :return: list of the prime factors of `position` in ascending order, with repetitions
+    """
+    primes = []
+    i = 2
+    while position > 1:
+        if position % i == 0:
+            primes.append(i)
+            position //= i
+        else:
+            i += 1
+    return primes
+
+
+def symbols_match_position(symbols, position):
+    """
+    :param symbols: a list of prime factors
+    :param position: a square on the board
+    :return: True if `symbols` are exactly the prime factors of `position`
+    """
+    for n in symbols:
+        if position % n:
+            return False
+        position //= n
+    return position == 1
+
+
+class Rules:
+    """
+    A rule variant. Rules objects are immutable and hashable; everything derived from the parameters
+    is computed once in the constructor.
+    """
+    def __init__(self, board_size=100, card_dict=None, extra_draw=1, starting_hand=1, deck_name=None):
+        """
+        :param board_size: the number of the last square; the first player to reach it wins
+        :param card_dict: dict mapping each number to the list of symbols on the cards with that number,
+            default is `carddict.cardDict`
+        :param extra_draw: at the end of a turn a player draws this many cards more than they played
+        :param starting_hand: number of cards dealt to each player at the start
+        :param deck_name: name of the deck for reports, default "standard" or "custom"
+        """
+        assert board_size >= 2, "The board needs at least two squares."
+        assert extra_draw >= 0, "Can't draw a negative number of cards."
+        assert starting_hand >= 0, "Can't deal a negative number of cards."
+        if deck_name is None:
+            deck_name = "standard" if card_dict is None else "custom"
+        card_dict = cardDict if card_dict is None else card_dict
+        for number, symbols in card_dict.items():
+            assert number >= 0, "Card numbers can't be negative."
+            assert all(prime_factors(symbol) == [symbol] for symbol in symbols), \
+                f"The symbols of card {number} must be primes."
+        self.board_size = board_size
+        self.card_dict = {number: tuple(symbols) for number, symbols in sorted(card_dict.items())}
+        self.extra_draw = extra_draw
+        self.starting_hand = starting_hand
+        self.deck_name = deck_name
+        # derived tables
+        self.deck = tuple((number, symbol) for number, symbols in self.card_dict.items() for symbol in symbols)
+        self.factors = tuple(tuple(prime_factors(square)) for square in range(board_size + 1))
+        self.key = (board_size, tuple(self.card_dict.items()), extra_draw, starting_hand)
+        self.hash = hash(self.key)
+
+    def __eq__(self, other):
+        return self is other or isinstance(other, Rules) and self.key == other.key
+
+    def __hash__(self):
+        return self.hash
+
+    def __str__(self):
+        return f"""board {self.board_size}, {self.deck_name} deck ({len(self.deck)} cards), draw played+{
+            self.extra_draw}, {self.starting_hand} card{'s' if self.starting_hand != 1 else ''} to start"""
+
+    def __repr__(self):
+        return f"<Rules {self}>"
+
+    def __getstate__(self):
+        return {"board_size": self.board_size, "card_dict": self.card_dict, "extra_draw": self.extra_draw,
+                "starting_hand": self.starting_hand, "deck_name": self.deck_name}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+DEFAULT_RULES = Rules()
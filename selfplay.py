@@ -0,0 +1,284 @@
+# Play the primes game
+# This module plays many games concurrently and evaluates a NumPy policy for all of them in one batch
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import asyncio
+
+import numpy as np
+
+from encoding import *
+from game import *
+
+
+class LinearPolicy:
+    """
+    logits = [state, move] @ weights. The state part is the same for all moves of one decision, so it
+    cancels in the softmax; it's only there so linear and MLP policies take the same input.
+    """
+    def __init__(self, weights=None, seed=None):
+        rng = np.random.default_rng(seed)
+        self.weights = rng.normal(0.0, 0.01, STATE_FEATURES + MOVE_FEATURES).astype(np.float32) \
+            if weights is None else np.asarray(weights, dtype=np.float32)
+
+    def logits(self, inputs):
+        """
+        :param inputs: float32 array of shape (rows, STATE_FEATURES + MOVE_FEATURES), one row per candidate move
+        :return: array of shape (rows,)
+        """
+        return inputs @ self.weights
+
+
+class MLPPolicy:
+    """
+    One hidden tanh layer: logits = tanh(inputs @ w1 + b1) @ w2.
+    """
+    def __init__(self, hidden=64, w1=None, b1=None, w2=None, seed=None):
+        rng = np.random.default_rng(seed)
+        inputs = STATE_FEATURES + MOVE_FEATURES
+        self.w1 = rng.normal(0.0, 1 / np.sqrt(inputs), (inputs, hidden)).astype(np.float32) if w1 is None else w1
+        self.b1 = np.zeros(hidden, dtype=np.float32) if b1 is None else b1
+        self.w2 = rng.normal(0.0, 1 / np.sqrt(hidden), hidden).astype(np.float32) if w2 is None else w2
+
+    def logits(self, inputs):
+        return np.tanh(inputs @ self.w1 + self.b1) @ self.w2
+
+
+class ExperienceWriter:
+    """
+    Append experience to a file as a stream of `np.save` records, so training can start reading before
+    self-play is finished and nothing has to fit into memory. Each chunk consists of five arrays:
+    state features (rows, STATE_FEATURES), chosen move features (rows, MOVE_FEATURES), log probability of the
+    chosen move (rows,), final reward of the player who moved (rows,) and game number (rows,).
+    """
+    def __init__(self, path, chunk_size=10000):
+        self.file = open(path, "ab")
+        self.chunk_size = chunk_size
+        self.buffer = []
+
+    def write_game(self, records):
+        """
+        :param records: list of (state, move, log_prob, reward, game number) tuples
+        :return: None
+        """
+        self.buffer += records
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        states, moves, log_probs, rewards, games = zip(*self.buffer)
+        np.save(self.file, np.stack(states))
+        np.save(self.file, np.stack(moves))
+        np.save(self.file, np.array(log_probs, dtype=np.float32))
+        np.save(self.file, np.array(rewards, dtype=np.float32))
+        np.save(self.file, np.array(games, dtype=np.int64))
+        self.file.flush()
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_experience(path):
+    """
+    Read a file written by ExperienceWriter chunk by chunk.
+    :param path: file name
+    :return: generator of (states, moves, log_probs, rewards, games) array tuples
+    """
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield tuple(np.load(f) for _ in range(5))
+            except (EOFError, ValueError):
+                return
+
+
+class PolicyPlayer(Player):
+    """
+    A seat in a self-play game. Instead of deciding itself, it hands its candidate moves to the driver
+    and waits until the driver has evaluated the policy for all games at once.
+    """
+    def __init__(self, driver, base_name=None):
+        self.driver = driver
+        super().__init__(base_name)
+
+    def _default_name(self) -> str:
+        return "Policy"
+
+    def reset(self):
+        super().reset()
+        self.cards_in_deck = DECK_SIZE
+        self.dealt_to_opponents = False
+        self.top_of_deck = None
+        self.records = []
+
+    def receive_card(self, card):
+        super().receive_card(card)
+        self.cards_in_deck -= 1
+
+    async def _choose_cards_to_play(self, opponents):
+        if not self.dealt_to_opponents:
+            # opponents' starting hands were dealt before anyone told us about draws
+            self.cards_in_deck -= self.rules.starting_hand * len(opponents)
+            self.dealt_to_opponents = True
+        l = self.legal_moves(opponents)
+        state = encode_state(self.position, self.hand, opponents, self.cards_in_deck, self.top_of_deck)
+        moves = np.stack([encode_move(move) for move in l])
+        choice, log_prob = await self.driver.decide(state, moves)
+        self.records.append((state, moves[choice], log_prob))
+        return l[choice]
+
+    def receive_information(self, info: Information):
+        if isinstance(info, CardDrawInfo):
+            self.cards_in_deck -= 1
+        elif isinstance(info, TopOfDeckInfo):
+            self.top_of_deck = info.number
+        elif isinstance(info, GameOverInfo):
+            self.game_over = True
+
+
+class SelfPlayDriver:
+    """
+    Keeps `concurrency` games running in one event loop. Whenever every running game is waiting for a decision,
+    the pending decisions are stacked into one matrix, the policy is evaluated with one batched call and a move
+    is sampled for each decision.
+    """
+    def __init__(self, policy, concurrency=1000, players_per_game=2, temperature=1.0, writer=None, seed=None):
+        """
+        :param policy: an object with a `logits(inputs)` method, e.g. LinearPolicy or MLPPolicy
+        :param concurrency: number of games played at the same time
+        :param players_per_game: number of PolicyPlayer seats per game
+        :param temperature: softmax temperature for sampling moves, 0 always picks the best move. The log
+            probability recorded for a move is the one it was sampled with, i.e. at this temperature; at
+            temperature 0 it is the policy's log probability at temperature 1.
+        :param writer: optional ExperienceWriter
+        :param seed: random seed for move sampling
+        """
+        assert 2 <= players_per_game <= MAX_OPPONENTS + 1, "Unsupported number of players."
+        self.policy = policy
+        self.concurrency = concurrency
+        self.players_per_game = players_per_game
+        self.temperature = temperature
+        self.writer = writer
+        self.rng = np.random.default_rng(seed)
+        self.pending = []
+        self.running = 0
+        self.ready = None
+        self.games_finished = 0
+        self.decisions = 0
+        self.batches = 0
+
+    async def decide(self, state, moves):
+        """
+        Called by a PolicyPlayer: queue a decision and wait for the batch evaluation.
+        :param state: state feature vector
+        :param moves: matrix of move feature vectors, one row per legal move
+        :return: tuple (index of the chosen move, log probability of the choice)
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((state, moves, future))
+        self._check_ready()
+        return await future
+
+    def _check_ready(self):
+        if len(self.pending) == self.running:
+            self.ready.set()
+
+    def evaluate(self, pending):
+        """
+        Evaluate the policy for a batch of decisions and resolve their futures.
+        :param pending: list of (state, moves, future) tuples
+        :return: None
+        """
+        counts = np.array([len(moves) for _, moves, _ in pending])
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        inputs = np.empty((counts.sum(), STATE_FEATURES + MOVE_FEATURES), dtype=np.float32)
+        inputs[:, :STATE_FEATURES] = np.repeat(np.stack([state for state, _, _ in pending]), counts, axis=0)
+        inputs[:, STATE_FEATURES:] = np.concatenate([moves for _, moves, _ in pending])
+        logits = self.policy.logits(inputs).astype(np.float64)
+        # log softmax per decision, at the temperature the moves are sampled with
+        maxima = np.maximum.reduceat(logits, starts)
+        shifted = logits - np.repeat(maxima, counts)
+        if self.temperature > 0:
+            shifted /= self.temperature
+        log_probs = shifted - np.repeat(np.log(np.add.reduceat(np.exp(shifted), starts)), counts)
+        # Gumbel-max trick: sample all decisions at once
+        if self.temperature > 0:
+            keys = shifted + self.rng.gumbel(size=len(shifted))
+        else:
+            keys = shifted
+        key_maxima = np.repeat(np.maximum.reduceat(keys, starts), counts)
+        first = np.flatnonzero(keys == key_maxima)
+        choices = first[np.searchsorted(first, starts)]
+        for (_, _, future), start, choice in zip(pending, starts, choices):
+            future.set_result((int(choice - start), float(log_probs[choice])))
+        self.decisions += len(pending)
+        self.batches += 1
+
+    async def play_game(self, players, game_number):
+        game = Game(*players)
+        await game.gameplay()
+        best_position = game.players[0].position
+        winners = [player for player in game.players if player.position == best_position]
+        if self.writer:
+            records = []
+            for player in players:
+                reward = 1 / len(winners) if player in winners else 0.0
+                records += [(state, move, log_prob, reward, game_number)
+                            for state, move, log_prob in player.records]
+            self.writer.write_game(records)
+        self.games_finished += 1
+
+    async def _run(self, games):
+        self.ready = asyncio.Event()
+        started = 0
+
+        async def slot():
+            nonlocal started
+            players = [PolicyPlayer(self) for _ in range(self.players_per_game)]
+            while started < games:
+                game_number = started
+                started += 1
+                await self.play_game(players, game_number)
+            self.running -= 1
+            self._check_ready()
+
+        self.running = min(self.concurrency, games)
+        slots = [asyncio.create_task(slot()) for _ in range(self.running)]
+        while self.running:
+            await self.ready.wait()
+            self.ready.clear()
+            pending, self.pending = self.pending, []
+            if pending:
+                self.evaluate(pending)
+        await asyncio.gather(*slots)
+
+    def run(self, games):
+        """
+        Play `games` self-play games.
+        :param games: number of games
+        :return: None
+        """
+        asyncio.run(self._run(games))
+        if self.writer:
+            self.writer.flush()
+
+
+if __name__ == '__main__':
+    import time
+    with ExperienceWriter("selfplay.npy") as writer:
+        driver = SelfPlayDriver(MLPPolicy(seed=1), concurrency=1000, writer=writer, seed=1)
+        start = time.time()
+        driver.run(5000)
+        elapsed = time.time() - start
+    print(f"""{driver.games_finished} games, {driver.decisions} decisions in {driver.batches} batches, {
+        elapsed:.1f} s ({driver.games_finished/elapsed:.0f} games/s)""")
@@ -0,0 +1,307 @@
+# Play the primes game
+# This module lets you watch bots play, a single game or a whole tournament, at any speed
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import collections
+import threading
+import time
+
+from main import *
+
+
+@dataclass
+class SpectatorFrame:
+    """
+    A snapshot of a game after a move. Players are listed in their seating order at the start of the game.
+    Card objects never change, so the hands are just copies of the players' lists.
+    """
+    game: int
+    names: Tuple[str, ...]
+    positions: Tuple[int, ...]
+    hands: Tuple[Tuple[Card, ...], ...]
+    top_of_deck: Union[int, None]
+    mover: Union[str, None]  # None for the frames at the start and the end of a game
+    cards_played: Tuple[Union[Card, int], ...]  # Card objects if revealed, otherwise numbers
+    revealed: bool
+    game_over: bool
+
+    def describe(self):
+        if self.game_over:
+            return f"""Game {self.game} over: {', '.join(f'{name} {position}' for name, position in sorted(
+                zip(self.names, self.positions), key=lambda entry: entry[1], reverse=True))}"""
+        if self.mover is None:
+            return f"Game {self.game} starts."
+        if not self.cards_played:
+            return f"{self.mover} passes"
+        if self.revealed:
+            return f"{self.mover} reveals {' '.join(f'{card.number}({card.symbol})' for card in self.cards_played)}"
+        return f"{self.mover} plays {' '.join(str(number) for number in self.cards_played)}"
+
+
+class Spectator:
+    """
+    Collects frames from a running game or tournament (pass it as `spectator=` to Game or Tournament) for a
+    viewer in another thread. The frames go into a bounded deque: recording never waits for the viewer, and
+    when the viewer falls behind, the oldest frames are dropped. Appending to and popping from a deque are
+    atomic, so no lock is needed.
+    """
+    def __init__(self, buffer_size=256):
+        """
+        :param buffer_size: maximum number of frames waiting for the viewer
+        """
+        self.frames = collections.deque(maxlen=buffer_size)
+        self.games = 0
+        self.frames_recorded = 0
+        self.seats = []
+        self.names = ()
+
+    def _frame(self, game, mover=None, cards_played=(), revealed=False, game_over=False):
+        seats = self.seats
+        return SpectatorFrame(self.games,
+                              self.names,
+                              tuple([player.position for player in seats]),
+                              tuple([tuple(player.hand) for player in seats]),
+                              game.deck[-1].number if game.deck else None,
+                              mover,
+                              cards_played,
+                              revealed,
+                              game_over)
+
+    def start_game(self, game):
+        self.games += 1
+        self.seats = list(game.players)
+        self.names = tuple(player.name for player in self.seats)
+        self.record_frame(self._frame(game))
+
+    def record(self, game, player, cards_played, revealed):
+        """
+        Called by the Game after every move.
+        :param game: the Game
+        :param player: the Player who moved
+        :param cards_played: the cards as the opponents see them: Card objects if revealed, otherwise numbers
+        :param revealed: True if the cards were played revealed
+        :return: None
+        """
+        self.record_frame(self._frame(game, player.name, tuple(cards_played), revealed))
+
+    def end_game(self, game):
+        self.record_frame(self._frame(game, game_over=True))
+
+    def record_frame(self, frame):
+        self.frames.append(frame)
+        self.frames_recorded += 1
+
+    def take(self, n):
+        """
+        Remove up to `n` of the oldest frames.
+        :param n: maximum number of frames, None for all
+        :return: list of frames, oldest first
+        """
+        frames = []
+        popleft = self.frames.popleft
+        try:
+            while n is None or len(frames) < n:
+                frames.append(popleft())
+        except IndexError:
+            pass
+        return frames
+
+
+class SpectatorGUI(CardGameGUI):
+    """
+    A window that shows the frames of a Spectator: every player's square and hand, face up, and a log of the
+    moves. It renders at most `fps` frames per second and advances by `speed` moves per second of playback;
+    the frames in between are skipped. Rendering only reconfigures the widgets whose images have changed.
+    """
+    SPEEDS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, None)  # moves per second, None is live
+
+    def __init__(self, master, spectator, fps=30, speed=5):
+        """
+        :param master: the Tk root window
+        :param spectator: the Spectator to show
+        :param fps: maximum number of frames rendered per second
+        :param speed: initial playback speed, one of SPEEDS
+        """
+        assert speed in self.SPEEDS, f"Speed must be one of {self.SPEEDS}."
+        self.spectator = spectator
+        self.fps = fps
+        self.speed_index = self.SPEEDS.index(speed)
+        self.budget = 0.0
+        self.rows = []
+        self.frames_rendered = 0
+        self.render_start = time.monotonic()
+        super().__init__(master, None, None)
+        self.master.title("Grant's Game: spectator")
+        self.images_shown = {}  # label -> image key, to skip configure() calls that change nothing
+        self.master.after(0, self.tick)
+
+    def create_widgets(self):
+        self.main_frame = tk.Frame(self.master, bg=self.BACKGROUND_COLOR)
+        self.main_frame.pack(fill='both', expand=True)
+
+        self.left_frame = tk.Frame(self.main_frame, bg=self.BACKGROUND_COLOR, padx=5)
+        self.left_frame.grid(row=0, column=0, sticky='nsew')
+
+        self.top_info_frame = tk.Frame(self.left_frame, bg=self.BACKGROUND_COLOR)
+        self.top_info_frame.pack(pady=5)
+
+        self.game_label = tk.Label(self.top_info_frame, text="Waiting for the game to start", width=20,
+                                   bg=self.BACKGROUND_COLOR, fg=self.FOREGROUND_COLOR)
+        self.game_label.pack(side='left', padx=5)
+
+        self.top_of_deck_label = tk.Label(self.top_info_frame, text="Top of deck:", bg=self.BACKGROUND_COLOR, fg=self.FOREGROUND_COLOR)
+        self.top_of_deck_label.pack(side='left', padx=5)
+
+        self.deck_top_label = tk.Label(self.top_info_frame, image=self.image_objects["None"], bg=self.BACKGROUND_COLOR)
+        self.deck_top_label.pack(side='left', padx=5)
+
+        self.players_frame = tk.Frame(self.left_frame, bg=self.BACKGROUND_COLOR)
+        self.players_frame.pack(pady=5)
+
+        self.controls_frame = tk.Frame(self.left_frame, bg=self.BACKGROUND_COLOR)
+        self.controls_frame.pack(pady=5)
+
+        self.speed_label = tk.Label(self.controls_frame, width=20, bg=self.BACKGROUND_COLOR, fg=self.FOREGROUND_COLOR)
+        self.speed_label.pack(side='left', padx=5)
+
+        self.speed_scale = tk.Scale(self.controls_frame, from_=0, to=len(self.SPEEDS) - 1, orient='horizontal',
+                                    showvalue=False, length=200, command=self.set_speed,
+                                    bg=self.BACKGROUND_COLOR, fg=self.FOREGROUND_COLOR, highlightthickness=0,
+                                    troughcolor=self.BUTTON_BACKGROUND_COLOR)
+        self.speed_scale.set(self.speed_index)
+        self.speed_scale.pack(side='left', padx=5)
+        self.set_speed(self.speed_index)
+
+        self.status_label = tk.Label(self.left_frame, bg=self.BACKGROUND_COLOR, fg=self.FOREGROUND_COLOR)
+        self.status_label.pack(pady=5)
+
+        self.right_frame = tk.Frame(self.main_frame, bg=self.BACKGROUND_COLOR)
+        self.right_frame.grid(row=0, column=1, sticky='nsew')
+
+        self.scrollbar = tk.Scrollbar(self.right_frame)
+        self.scrollbar.pack(side='right', fill='y')
+
+        font = self.status_label.cget("font")
+        self.log_text = tk.Text(self.right_frame, wrap='word', width = 30,
+                                font=font,
+                                yscrollcommand=self.scrollbar.set,
+                                bg=self.BACKGROUND_COLOR,
+                                fg=self.FOREGROUND_COLOR,
+                                borderwidth=0,
+                                highlightthickness=0)
+        self.log_text.pack(expand=True, fill='both', pady=5)
+        self.scrollbar.config(command=self.log_text.yview)
+
+        self.main_frame.columnconfigure(1, weight=1)
+        self.main_frame.rowconfigure(0, weight=1)
+
+    def set_speed(self, value):
+        self.speed_index = int(value)
+        speed = self.SPEEDS[self.speed_index]
+        self.speed_label.configure(text="Paused" if speed == 0 else "Live" if speed is None
+                                   else f"{speed} moves per second")
+
+    def add_row(self):
+        row = tk.Frame(self.players_frame, bg=self.BACKGROUND_COLOR)
+        row.pack(fill='x', pady=2)
+        name_label = tk.Label(row, width=12, anchor='e', bg=self.BACKGROUND_COLOR, fg=self.FOREGROUND_COLOR)
+        name_label.pack(side='left', padx=5)
+        position_label = tk.Label(row, bg=self.BACKGROUND_COLOR)
+        position_label.pack(side='left', padx=5)
+        cards_frame = tk.Frame(row, bg=self.BACKGROUND_COLOR)
+        cards_frame.pack(side='left', padx=5)
+        self.rows.append((row, name_label, position_label, cards_frame, []))
+
+    def set_image(self, label, key):
+        if self.images_shown.get(label) != key:
+            label.configure(image=self.image_objects[key])
+            self.images_shown[label] = key
+
+    def render(self, frame):
+        """
+        Show a frame, reusing the widgets of the previous one.
+        :param frame: a SpectatorFrame
+        :return: None
+        """
+        while len(self.rows) < len(frame.names):
+            self.add_row()
+        for i, (row, name_label, position_label, cards_frame, card_labels) in enumerate(self.rows):
+            if i >= len(frame.names):
+                row.pack_forget()
+                continue
+            if not row.winfo_manager():
+                row.pack(fill='x', pady=2)
+            if name_label.cget("text") != frame.names[i]:
+                name_label.configure(text=frame.names[i])
+            self.set_image(position_label, frame.positions[i])
+            hand = frame.hands[i]
+            while len(card_labels) < len(hand):
+                card_labels.append(tk.Label(cards_frame, bg=self.BACKGROUND_COLOR))
+            for j, card_label in enumerate(card_labels):
+                if j < len(hand):
+                    self.set_image(card_label, f"{hand[j].number}({hand[j].symbol})")
+                    if not card_label.winfo_manager():
+                        card_label.pack(side='left')
+                elif card_label.winfo_manager():
+                    card_label.pack_forget()
+        self.set_image(self.deck_top_label, str(frame.top_of_deck))
+        self.game_label.configure(text=f"Game {frame.game}")
+        self.log_message(frame.describe())
+        self.frames_rendered += 1
+
+    def tick(self):
+        """
+        Called `fps` times per second by Tk: take the frames due since the last tick and render the newest.
+        """
+        speed = self.SPEEDS[self.speed_index]
+        if speed is None:
+            frames = self.spectator.take(None)
+            self.budget = 0.0
+        else:
+            self.budget += speed / self.fps
+            due = int(self.budget)
+            frames = self.spectator.take(due)
+            if due and not frames:
+                self.budget = 0.0  # the engine is slower than the playback, don't save up moves
+            else:
+                self.budget -= due
+        if frames:
+            self.render(frames[-1])
+        elapsed = time.monotonic() - self.render_start
+        self.status_label.configure(text=f"""{self.frames_rendered / elapsed:.0f} fps, {
+            self.spectator.games} games, {self.spectator.frames_recorded} frames, {
+            self.spectator.frames_recorded - self.frames_rendered - len(self.spectator.frames)} skipped""")
+        self.master.after(max(1, round(1000 / self.fps)), self.tick)
+
+    def log_message(self, message):
+        super().log_message(message)
+        # keep the log short, it would get slow otherwise
+        if int(self.log_text.index('end-1c').split('.')[0]) > 500:
+            self.log_text.configure(state='normal')
+            self.log_text.delete('1.0', '101.0')
+            self.log_text.configure(state='disabled')
+
+
+def watch(run, spectator, fps=30, speed=5):
+    """
+    Run a game or tournament in a background thread and watch it. Returns when the window is closed; the
+    background thread is a daemon, so it doesn't keep the program alive.
+    :param run: function that plays the games, with `spectator` attached to them
+    :param spectator: the Spectator attached to the games
+    :param fps: maximum number of frames rendered per second
+    :param speed: initial playback speed in moves per second, one of SpectatorGUI.SPEEDS
+    :return: None
+    """
+    thread = threading.Thread(target=run, daemon=True)
+    root = tk.Tk()
+    SpectatorGUI(root, spectator, fps, speed)
+    thread.start()
+    root.mainloop()
+
+
+if __name__ == '__main__':
+    spectator = Spectator()
+    t = Tournament(Forrest(), GreedyTortoise(), spectator=spectator)
+    watch(lambda: t.run(100000), spectator)
+    t.print_results()
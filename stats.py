@@ -0,0 +1,111 @@
+# Play the primes game
+# This module contains the statistics used to compare players
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import math
+
+ELO_SCALE = 400
+GLICKO_Q = math.log(10) / ELO_SCALE
+
+
+def wilson_interval(score, n, z=1.96):
+    """
+    Confidence interval for a win rate.
+    :param score: number of wins (ties may be counted as fractions)
+    :param n: number of games
+    :param z: quantile of the normal distribution, 1.96 for 95% confidence
+    :return: tuple (low, high)
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = score / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def elo_expected(rating, opponent_rating):
+    """
+    :return: the expected score of a player with `rating` against a player with `opponent_rating`
+    """
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / ELO_SCALE))
+
+
+def elo_update(rating, opponent_rating, score, games=1, k=32):
+    """
+    Elo update after a match. The match counts like a single game won with the fraction of points scored,
+    so long matches don't make the ratings swing wildly.
+    :param rating: rating of the player before the match
+    :param opponent_rating: rating of the opponent before the match
+    :param score: points scored by the player in the match
+    :param games: number of games in the match
+    :param k: K-factor per match
+    :return: the new rating
+    """
+    return rating + k * (score / games - elo_expected(rating, opponent_rating))
+
+
+class GlickoRating:
+    """
+    A Glicko-1 rating: a rating together with its rating deviation (RD).
+    """
+    def __init__(self, rating=1500.0, rd=350.0):
+        self.rating = rating
+        self.rd = rd
+
+    def __str__(self):
+        return f"{self.rating:.0f} ± {self.rd:.0f}"
+
+    def __repr__(self):
+        return f"GlickoRating({self.rating:.1f}, {self.rd:.1f})"
+
+    def interval(self, z=1.96):
+        """
+        :return: tuple (low, high) confidence interval for the rating
+        """
+        return self.rating - z * self.rd, self.rating + z * self.rd
+
+    def update(self, results, c=0.0):
+        """
+        Update the rating at the end of a rating period.
+        :param results: list of (opponent GlickoRating, score, games) tuples where `score` is the number of points
+            scored against that opponent out of `games` games. Use the opponents' ratings from before the period.
+        :param c: increase of the RD per period to model changes in playing strength; 0 for bots that don't learn
+        :return: None
+        """
+        rd = min(math.sqrt(self.rd ** 2 + c ** 2), 350.0)
+        d_inverse = 0.0
+        improvement = 0.0
+        for opponent, score, games in results:
+            g = 1 / math.sqrt(1 + 3 * GLICKO_Q ** 2 * opponent.rd ** 2 / math.pi ** 2)
+            expected = 1 / (1 + 10 ** (-g * (self.rating - opponent.rating) / ELO_SCALE))
+            d_inverse += games * GLICKO_Q ** 2 * g ** 2 * expected * (1 - expected)
+            improvement += g * (score - games * expected)
+        if not results:
+            self.rd = rd
+            return
+        variance = 1 / (1 / rd ** 2 + d_inverse)
+        self.rating += GLICKO_Q * variance * improvement
+        self.rd = math.sqrt(variance)
+
+
+def sprt_bounds(alpha, beta):
+    """
+    Wald's bounds for a sequential probability ratio test.
+    :param alpha: probability of accepting H1 although H0 is true
+    :param beta: probability of accepting H0 although H1 is true
+    :return: tuple (lower, upper): accept H0 when the log likelihood ratio drops to `lower`, H1 when it reaches `upper`
+    """
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def sprt_llr(score, n, p0, p1):
+    """
+    Log likelihood ratio of H1: win rate is `p1` versus H0: win rate is `p0`.
+    :param score: number of wins, ties may be counted as fractions
+    :param n: number of games
+    :return: the log likelihood ratio
+    """
+    return score * math.log(p1 / p0) + (n - score) * math.log((1 - p1) / (1 - p0))
@@ -0,0 +1,80 @@
+# Play the primes game
+# This module plays many games under different rule variants to explore the game design
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import itertools
+import multiprocessing
+import random
+
+from analytics import AnalyticsCollector
+from main import *
+
+
+def rule_grid(board_sizes=(100,), decks=None, extra_draws=(1,), starting_hands=(1,)):
+    """
+    All combinations of the given rule parameters.
+    :param board_sizes: board sizes to try
+    :param decks: dict mapping a deck name to a card dict, default is just the standard deck
+    :param extra_draws: values for the number of cards drawn in addition to the number played
+    :param starting_hands: values for the number of cards dealt at the start
+    :return: list of Rules
+    """
+    decks = {"standard": cardDict} if decks is None else decks
+    return [Rules(board_size, card_dict, extra_draw, starting_hand, deck_name)
+            for board_size, (deck_name, card_dict), extra_draw, starting_hand
+            in itertools.product(board_sizes, decks.items(), extra_draws, starting_hands)]
+
+
+def evaluate_variant(rules, specs, games, seed):
+    """
+    Play games under one rule variant. This runs in a worker process, so the arguments must be picklable.
+    :param rules: the Rules
+    :param specs: PlayerSpecs, one per seat
+    :param games: number of games
+    :param seed: random seed
+    :return: dict of statistics, including an AnalyticsCollector under "analytics"
+    """
+    random.seed(seed)
+    t = Tournament.from_specs(*specs, rules=rules)
+    t.analytics = AnalyticsCollector(rules.board_size)
+    t.run(games)
+    return {"rules": rules,
+            "games": games,
+            "turns": t.number_of_turns / games,
+            "setbacks": t.number_of_setbacks / games,
+            "setbacks_per_turn": t.number_of_setbacks / t.number_of_turns,
+            "deck_exhausted": t.number_used_all_cards / games,
+            "winning_score": t.winning_score / games,
+            "analytics": t.analytics}
+
+
+def sweep(variants, players=(Forrest, Forrest), games=1000, workers=None, seed=None):
+    """
+    Evaluate rule variants in parallel.
+    :param variants: list of Rules, e.g. from rule_grid()
+    :param players: PlayerSpecs or Player subclasses, one per seat
+    :param games: number of games per variant
+    :param workers: number of worker processes, default is the number of CPUs
+    :param seed: random seed for reproducible sweeps
+    :return: list of dicts of statistics, in the order of `variants`; merge their "analytics" with
+        `AnalyticsCollector.merge()` to combine variants with the same board size
+    """
+    rng = random.Random(seed)
+    specs = tuple(as_spec(player) for player in players)
+    jobs = [(rules, specs, games, rng.getrandbits(64)) for rules in variants]
+    with multiprocessing.Pool(workers) as pool:
+        return pool.starmap(evaluate_variant, jobs)
+
+
+def print_sweep(results):
+    width = max(len(str(result['rules'])) for result in results)
+    print(f"{'Variant':<{width}} {'Turns':>6} {'Setbacks':>8} {'/turn':>6} {'Deck out':>8} {'Win score':>9}")
+    for result in results:
+        print(f"""{str(result['rules']):<{width}} {result['turns']:>6.1f} {result['setbacks']:>8.2f} {
+            result['setbacks_per_turn']:>6.3f} {result['deck_exhausted']*100:>7.1f}% {
+            result['winning_score']:>9.1f}""")
+
+
+if __name__ == '__main__':
+    print_sweep(sweep(rule_grid(board_sizes=(60, 100, 150), extra_draws=(0, 1, 2), starting_hands=(1, 3))))
@@ -0,0 +1,149 @@
+# Play the primes game
+# This module tunes the weights of HeuristicBot by racing candidates against each other (successive halving)
+# Game design: Grant Sinclair
+# Code: Harald Bögeholz
+
+import multiprocessing
+import random
+
+from main import *
+
+
+def play_batch(spec, opponent_specs, games, seed):
+    """
+    Play a batch of games of one candidate against fixed opponents, rotating the seats so that the candidate
+    moves first, second, ... equally often. This runs in a worker process, so the arguments must be picklable.
+    :param spec: PlayerSpec of the candidate
+    :param opponent_specs: PlayerSpecs of the opponents
+    :param games: number of games, preferably a multiple of the number of players
+    :param seed: random seed; all candidates play the same deals for the same seed
+    :return: points scored by the candidate
+    """
+    random.seed(seed)
+    candidate = spec.create()
+    t = Tournament(candidate, *(opponent_spec.create() for opponent_spec in opponent_specs))
+    seats = len(t.players)
+    for seat in range(seats):
+        t.players = t.players[-1:] + t.players[:-1]
+        t.run(games // seats + (seat < games % seats))
+    return t.scores[id(candidate)]
+
+
+DEFAULT_RANGES = {"revealed": (0.0, 20.0), "distance": (0.0, 2.0), "setback": (0.0, 20.0), "cards_kept": (-1.0, 1.0),
+                  "prime": (-1.0, 1.0), "composite": (-1.0, 1.0), "deck": (-1.0, 1.0), "pass_ahead": (-1.0, 1.0)}
+
+
+def sample_weights(rng, ranges=None):
+    """
+    Draw random weights for HeuristicBot.
+    :param rng: a random.Random object
+    :param ranges: dict mapping features to (low, high), missing features are taken from DEFAULT_RANGES
+    :return: dict of weights
+    """
+    ranges = {**DEFAULT_RANGES, **(ranges or {})}
+    return {feature: round(rng.uniform(*ranges[feature]), 3) for feature in HeuristicBot.FEATURES}
+
+
+class RaceEntry:
+    """
+    One candidate in a race and the points it has collected so far.
+    """
+    def __init__(self, weights):
+        self.weights = weights
+        self.spec = PlayerSpec.of(HeuristicBot, **weights)
+        self.points = 0.0
+        self.games = 0
+
+    @property
+    def score(self):
+        return self.points / self.games if self.games else 0.0
+
+
+class Race:
+    """
+    Successive halving: every round each surviving candidate plays the same new batches of fixed-seed games,
+    then only the best 1/`eta` survive and the next round plays `eta` times as many games. Every round costs
+    about the same, so the total cost is (number of candidates) * `games` * (number of rounds) and grows only
+    logarithmically with the number of candidates.
+    """
+    def __init__(self, candidates, opponents=(Forrest,), games=20, eta=2, batch_size=20, workers=None, seed=None):
+        """
+        :param candidates: list of weight dicts for HeuristicBot
+        :param opponents: PlayerSpecs or Player subclasses of the fixed opponents
+        :param games: number of games per candidate in the first round
+        :param eta: factor by which the field shrinks and the number of games grows every round
+        :param batch_size: number of games in one job for the worker pool
+        :param workers: number of worker processes, default is the number of CPUs
+        :param seed: random seed for reproducible races
+        """
+        assert len(candidates) >= 1, "A race needs at least one candidate."
+        assert eta >= 2, "The field has to shrink every round."
+        self.entries = [RaceEntry(weights) for weights in candidates]
+        self.opponents = tuple(as_spec(opponent) for opponent in opponents)
+        self.games = games
+        self.eta = eta
+        self.batch_size = batch_size
+        self.workers = workers
+        self.random = random.Random(seed)
+        self.rounds_played = 0
+        self.games_played = 0
+        self.verbose = False
+
+    def set_verbose(self, verbose):
+        self.verbose = verbose
+
+    def play_round(self, entries, games, pool):
+        """
+        Play `games` more games for each of `entries`. All entries get the same seeds.
+        :return: None
+        """
+        batches = [min(self.batch_size, games - start) for start in range(0, games, self.batch_size)]
+        seeds = [self.random.getrandbits(64) for _ in batches]
+        jobs = [(entry.spec, self.opponents, batch, seed) for entry in entries for batch, seed in zip(batches, seeds)]
+        results = iter(pool.starmap(play_batch, jobs))
+        for entry in entries:
+            for batch in batches:
+                entry.points += next(results)
+                entry.games += batch
+        self.games_played += len(entries) * games
+        self.rounds_played += 1
+
+    def run(self):
+        """
+        Race until one candidate is left. A single candidate still plays the first round, so it gets a score.
+        :return: the winning RaceEntry
+        """
+        survivors = list(self.entries)
+        games = self.games
+        with multiprocessing.Pool(self.workers) as pool:
+            while True:
+                self.play_round(survivors, games, pool)
+                survivors.sort(key=lambda entry: entry.score, reverse=True)
+                if self.verbose:
+                    print(f"""Round {self.rounds_played}: {len(survivors)} candidates, {games} games each, best {
+                        survivors[0].score*100:.1f}% {survivors[0].weights}""")
+                survivors = survivors[:max(1, len(survivors) // self.eta)]
+                if len(survivors) == 1:
+                    return survivors[0]
+                games *= self.eta
+
+
+def tune(candidates=64, opponents=(Forrest,), games=20, eta=2, workers=None, seed=None, ranges=None):
+    """
+    Tune HeuristicBot against the given opponents. The default weights are always one of the candidates.
+    :param candidates: number of candidates
+    :param ranges: dict mapping features to (low, high) for sampling weights
+    :return: the winning RaceEntry
+    """
+    rng = random.Random(seed)
+    weights = [dict(HeuristicBot.DEFAULT_WEIGHTS)] + [sample_weights(rng, ranges) for _ in range(candidates - 1)]
+    race = Race(weights, opponents, games, eta, workers=workers, seed=rng.getrandbits(64))
+    race.set_verbose(True)
+    best = race.run()
+    print(f"{race.games_played} games played, winner scored {best.score*100:.1f}% in {best.games} games:")
+    print(best.weights)
+    return best
+
+
+if __name__ == '__main__':
+    tune(seed=1)